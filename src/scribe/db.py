@@ -1,5 +1,8 @@
+import atexit
+import functools
 import logging
 import sqlite3
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -14,6 +17,34 @@ APPLE_EPOCH_OFFSET = 978307200
 VOICE_MEMOS_DIR = Path.home() / "Library" / "Group Containers" / "group.com.apple.VoiceMemos.shared" / "Recordings"
 CLOUD_RECORDINGS_DB = VOICE_MEMOS_DIR / "CloudRecordings.db"
 
+_RECORDINGS_QUERY = (
+    "SELECT ZPATH, ZCUSTOMLABEL, ZENCRYPTEDTITLE, ZDATE, ZDURATION "
+    "FROM ZCLOUDRECORDING WHERE ZPATH IS NOT NULL"
+)
+# One recording's current row, by its stored ZPATH
+_RECORDING_QUERY = _RECORDINGS_QUERY + " AND ZPATH = ?"
+
+# Abbreviated English month names, indexed by datetime.month. Used instead of
+# strftime("%b"), which follows the C locale and needs the non-portable %-d.
+_MONTHS = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Shared read-only connection, opened on first lookup and reused across calls
+_conn: sqlite3.Connection | None = None
+_conn_lock = threading.Lock()
+# Recording rows keyed by file basename, loaded in one scan and refreshed on a
+# miss. Hits only use it to find the stored ZPATH, then re-read that row.
+_index: dict[str, sqlite3.Row] | None = None
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_duration(seconds: float) -> str:
+    total = int(seconds)
+    hrs, remainder = divmod(total, 3600)
+    mins, secs = divmod(remainder, 60)
+    if hrs > 0:
+        return f"{hrs}:{mins:02d}:{secs:02d}"
+    return f"{mins}:{secs:02d}"
+
 
 @dataclass
 class RecordingMetadata:
@@ -21,19 +52,154 @@ class RecordingMetadata:
     date: datetime
     duration_seconds: float
 
+    # Display strings shared by the HTML and Markdown formatters. Computed on
+    # first use, so bulk-prefetched metadata that's never rendered costs nothing.
+    @functools.cached_property
+    def date_str(self) -> str:
+        return f"{_MONTHS[self.date.month]} {self.date.day}, {self.date.year}"
+
+    @functools.cached_property
+    def duration_str(self) -> str:
+        return _format_duration(self.duration_seconds)
+
+
+@functools.lru_cache(maxsize=1024)
+def _apple_seconds_to_datetime(apple_secs: int) -> datetime:
+    return datetime.fromtimestamp(apple_secs + APPLE_EPOCH_OFFSET, tz=timezone.utc)
+
 
 def _apple_timestamp_to_datetime(apple_ts: float) -> datetime:
-    unix_ts = apple_ts + APPLE_EPOCH_OFFSET
-    return datetime.fromtimestamp(unix_ts, tz=timezone.utc)
+    # Quantized to whole seconds so repeated timestamps hit the cache
+    return _apple_seconds_to_datetime(int(apple_ts))
+
 
+def _format_fallback_title(file_path: str, mod_time: datetime | None = None) -> str:
+    """Generate a title from filename + modification date when DB lookup fails.
 
-def _format_fallback_title(file_path: str) -> str:
-    """Generate a title from filename + modification date when DB lookup fails."""
-    p = Path(file_path)
-    mod_time = datetime.fromtimestamp(p.stat().st_mtime, tz=timezone.utc)
+    Pass `mod_time` when the caller has already stat'ed the file.
+    """
+    if mod_time is None:
+        mod_time = datetime.fromtimestamp(Path(file_path).stat().st_mtime, tz=timezone.utc)
     return f"Voice Memo - {mod_time.strftime('%b %-d, %Y %-I:%M %p')}"
 
 
+def _get_conn() -> sqlite3.Connection:
+    """Return the shared read-only connection to the Voice Memos DB, opening it if needed."""
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(
+            f"file:{CLOUD_RECORDINGS_DB}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _conn = conn
+    return _conn
+
+
+def _close() -> None:
+    global _conn, _index
+    with _conn_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+        _index = None
+
+
+atexit.register(_close)
+
+
+def _index_rows(rows: list[sqlite3.Row]) -> dict[str, sqlite3.Row]:
+    return {Path(r["ZPATH"]).name: r for r in rows}
+
+
+def _load_index() -> dict[str, sqlite3.Row]:
+    """Rebuild the basename index from the shared connection.
+
+    Caller must hold _conn_lock.
+    """
+    global _index
+    _index = _index_rows(_get_conn().execute(_RECORDINGS_QUERY).fetchall())
+    return _index
+
+
+def _read_snapshot() -> list[sqlite3.Row]:
+    """Read all recording rows through a one-off immutable connection.
+
+    immutable=1 skips locking and WAL/journal checks entirely. Rows still
+    sitting in Voice Memos' WAL are not visible this way, which is acceptable
+    for a bulk prefetch: anything missing falls through to the live lookup.
+    It must not be used for the shared connection or the shared index, which
+    would then never observe new or updated recordings.
+    """
+    conn = sqlite3.connect(f"file:{CLOUD_RECORDINGS_DB}?mode=ro&immutable=1", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        return conn.execute(_RECORDINGS_QUERY).fetchall()
+    finally:
+        conn.close()
+
+
+def _lookup(relative_name: str) -> sqlite3.Row | None:
+    """Find the DB row for a recording by basename.
+
+    ZPATH can't be matched with an index-friendly predicate (its stored prefix
+    varies), so rather than a LIKE '%name' scan per lookup, all rows are loaded
+    into a dict once to map basenames to stored paths. A hit re-reads that one
+    row by exact ZPATH, so later edits (a rename, the final duration) are seen.
+    A miss reloads the dict, since the row may have been committed after the
+    last load.
+    """
+    with _conn_lock:
+        index = _index
+        if index is not None and (cached := index.get(relative_name)) is not None:
+            row = _get_conn().execute(_RECORDING_QUERY, (cached["ZPATH"],)).fetchone()
+            if row is not None:
+                index[relative_name] = row
+                return row
+        return _load_index().get(relative_name)
+
+
+def _row_to_metadata(row: sqlite3.Row, file_path: str) -> RecordingMetadata:
+    title = row["ZCUSTOMLABEL"] or row["ZENCRYPTEDTITLE"] or _format_fallback_title(file_path)
+    date = _apple_timestamp_to_datetime(row["ZDATE"])
+    duration = row["ZDURATION"] or 0.0
+    return RecordingMetadata(title=title, date=date, duration_seconds=duration)
+
+
+def get_recording_metadata_batch(paths: list[str]) -> dict[str, RecordingMetadata]:
+    """Look up metadata for many recordings with a single DB read.
+
+    Returns a dict keyed by file path containing only the recordings found in
+    the DB; callers fall back to get_recording_metadata for the rest.
+    """
+    try:
+        # Indexed locally: snapshot rows may miss WAL contents, so they
+        # mustn't become the shared index that later lookups trust
+        index = _index_rows(_read_snapshot())
+    except sqlite3.DatabaseError as e:  # includes malformed or non-database files
+        logger.debug("Immutable read failed, using shared connection: %s", e)
+        try:
+            with _conn_lock:
+                index = _load_index()
+        except sqlite3.DatabaseError as e:
+            logger.warning("Batch DB read failed: %s", e)
+            _close()
+            return {}
+
+    found = {}
+    for fp in paths:
+        row = index.get(Path(fp).name)
+        if row is None:
+            continue
+        try:
+            found[fp] = _row_to_metadata(row, fp)
+        except (TypeError, ValueError, OverflowError, OSError) as e:  # e.g. NULL ZDATE
+            # Left out, so only this recording goes through the per-file path
+            logger.warning("Bad DB row for %s, skipping prefetch: %s", Path(fp).name, e)
+    return found
+
+
 def get_recording_metadata(
     file_path: str,
     max_retries: int = 3,
@@ -48,25 +214,15 @@ def get_recording_metadata(
 
     for attempt in range(max_retries):
         try:
-            conn = sqlite3.connect(
-                f"file:{CLOUD_RECORDINGS_DB}?mode=ro", uri=True
-            )
-            conn.row_factory = sqlite3.Row
-            row = conn.execute(
-                "SELECT ZCUSTOMLABEL, ZENCRYPTEDTITLE, ZDATE, ZDURATION "
-                "FROM ZCLOUDRECORDING WHERE ZPATH LIKE ?",
-                (f"%{relative_name}",),
-            ).fetchone()
-            conn.close()
+            row = _lookup(relative_name)
 
             if row is not None:
-                title = row["ZCUSTOMLABEL"] or row["ZENCRYPTEDTITLE"] or _format_fallback_title(file_path)
-                date = _apple_timestamp_to_datetime(row["ZDATE"])
-                duration = row["ZDURATION"] or 0.0
-                return RecordingMetadata(title=title, date=date, duration_seconds=duration)
+                return _row_to_metadata(row, file_path)
 
-        except sqlite3.OperationalError as e:
+        except sqlite3.DatabaseError as e:
             logger.warning("DB read attempt %d failed: %s", attempt + 1, e)
+            # Drop the connection so the next attempt reconnects
+            _close()
 
         if attempt < max_retries - 1:
             logger.debug("No DB match for %s, retrying in %.1fs...", relative_name, retry_delay)
@@ -74,10 +230,9 @@ def get_recording_metadata(
 
     # Fallback: no DB match after retries
     logger.info("No DB match for %s, using fallback title", relative_name)
-    p = Path(file_path)
-    mod_time = datetime.fromtimestamp(p.stat().st_mtime, tz=timezone.utc)
+    mod_time = datetime.fromtimestamp(Path(file_path).stat().st_mtime, tz=timezone.utc)
     return RecordingMetadata(
-        title=_format_fallback_title(file_path),
+        title=_format_fallback_title(file_path, mod_time),
         date=mod_time,
         duration_seconds=0.0,
     )
@@ -1,32 +1,41 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from dataclasses import dataclass
+from html import escape
+from itertools import groupby
+from operator import itemgetter
+
 from scribe.db import RecordingMetadata
 from scribe.summarizer import Summary
 
+# Per-utterance lines for multi-speaker output, filled with (speaker number, text)
+_SPEAKER_LINE_HTML = "<p><b>Speaker %d:</b> %s</p>"
+_SPEAKER_LINE_MD = "**Speaker %d:** %s"
+
+# Summary list sections in display order: (heading, Summary attribute)
+_SUMMARY_SECTIONS = (
+    ("Key Points", "key_points"),
+    ("Action Items", "action_items"),
+    ("Decisions", "decisions"),
+    ("Open Questions", "open_questions"),
+)
 
-def _format_duration(seconds: float) -> str:
-    total = int(seconds)
-    hrs, remainder = divmod(total, 3600)
-    mins, secs = divmod(remainder, 60)
-    if hrs > 0:
-        return f"{hrs}:{mins:02d}:{secs:02d}"
-    return f"{mins}:{secs:02d}"
+# Key for grouping (speaker, text) pairs into turns
+_speaker_of = itemgetter(0)
 
 
 def _get_utterances(response: dict) -> list[dict] | None:
     """Extract utterances from Deepgram response."""
-    results = response.get("results", {})
-    return results.get("utterances")
+    return response.get("results", {}).get("utterances")
 
 
 def _get_transcript_text(response: dict) -> str:
     """Extract plain transcript text as fallback when utterances aren't available."""
-    channels = response.get("results", {}).get("channels", [])
-    if channels:
-        alternatives = channels[0].get("alternatives", [])
-        if alternatives:
-            return alternatives[0].get("transcript", "")
-    return ""
+    try:
+        return response["results"]["channels"][0]["alternatives"][0].get("transcript", "")
+    except (KeyError, IndexError, TypeError):  # missing or null fields
+        return ""
 
 
 def _count_speakers(utterances: list[dict]) -> int:
@@ -34,98 +43,130 @@ def _count_speakers(utterances: list[dict]) -> int:
     return len(speakers)
 
 
+def _speaker_turns(utterances: list[dict]) -> Iterator[tuple[int, str]]:
+    """Yield (speaker, text) turns, merging consecutive utterances by the same speaker."""
+    spoken = (
+        (u.get("speaker", 0), text) for u in utterances if (text := u.get("transcript", "").strip())
+    )
+    for speaker, turn in groupby(spoken, key=_speaker_of):
+        yield speaker, " ".join([text for _, text in turn])
+
+
+@dataclass
+class PreparedTranscript:
+    """Everything both output formats need, extracted from a response once."""
+    utterances: list[dict] | None
+    num_speakers: int
+    text: str  # plain transcript, only filled in when there are no utterances
+    display_title: str
+    date_str: str
+    duration_str: str
+    summary: Summary | None
+
+
+def prepare_transcript(
+    response: dict,
+    metadata: RecordingMetadata,
+    title: str | None = None,
+    summary: Summary | None = None,
+) -> PreparedTranscript:
+    """Extract the parts of a Deepgram response used by render_html/render_markdown."""
+    utterances = _get_utterances(response)
+    return PreparedTranscript(
+        utterances=utterances,
+        num_speakers=_count_speakers(utterances) if utterances else 0,
+        text="" if utterances else _get_transcript_text(response),
+        display_title=title or metadata.title,
+        date_str=metadata.date_str,
+        duration_str=metadata.duration_str,
+        summary=summary,
+    )
+
+
 def format_transcript(
     response: dict,
     metadata: RecordingMetadata,
     title: str | None = None,
     summary: Summary | None = None,
 ) -> str:
-    """Convert a Deepgram response into HTML for Apple Notes."""
-    display_title = title or metadata.title
-    date_str = metadata.date.strftime("%b %-d, %Y")
-    duration_str = _format_duration(metadata.duration_seconds)
-    utterances = _get_utterances(response)
+    """Convert a Deepgram response into HTML for Apple Notes.
+
+    Transcript and summary text is HTML-escaped, so a literal "<" or "&"
+    can't break the markup.
+    """
+    return render_html(prepare_transcript(response, metadata, title, summary))
 
-    if utterances and _count_speakers(utterances) > 1:
-        return _format_multi_speaker(utterances, display_title, date_str, duration_str, summary)
-    elif utterances:
-        return _format_single_speaker(utterances, display_title, date_str, duration_str, summary)
+
+def render_html(t: PreparedTranscript) -> str:
+    if t.num_speakers > 1:
+        return _format_multi_speaker(
+            t.utterances, t.display_title, t.date_str, t.duration_str, t.summary, t.num_speakers
+        )
+    elif t.utterances:
+        return _format_single_speaker(t.utterances, t.display_title, t.date_str, t.duration_str, t.summary)
     else:
-        text = _get_transcript_text(response)
-        return _format_plain_text(text, display_title, date_str, duration_str, summary)
+        return _format_plain_text(t.text, t.display_title, t.date_str, t.duration_str, t.summary)
 
 
-def _summary_html(summary: Summary | None) -> list[str]:
+def _summary_html(summary: Summary | None) -> str:
+    """Render the summary block, newline-terminated, or "" when there's no summary."""
     if not summary:
-        return []
-    lines = [f"<p>{summary.summary}</p>"]
-    for heading, items in [
-        ("Key Points", summary.key_points),
-        ("Action Items", summary.action_items),
-        ("Decisions", summary.decisions),
-        ("Open Questions", summary.open_questions),
-    ]:
-        if items:
+        return ""
+    lines = [f"<p>{escape(summary.summary, quote=False)}</p>"]
+    for heading, attr in _SUMMARY_SECTIONS:
+        if items := getattr(summary, attr):
             lines.append(f"<h2>{heading}</h2>")
             lines.append("<ul>")
-            for item in items:
-                lines.append(f"<li>{item}</li>")
+            lines.extend(f"<li>{escape(item, quote=False)}</li>" for item in items)
             lines.append("</ul>")
     lines.append("<hr>")
-    return lines
+    return "\n".join(lines) + "\n"
 
 
 def _format_multi_speaker(
     utterances: list[dict], title: str, date_str: str, duration_str: str,
-    summary: Summary | None = None,
+    summary: Summary | None, num_speakers: int,
 ) -> str:
-    num_speakers = _count_speakers(utterances)
-    lines = [
-        f"<h1>{title} - {date_str}</h1>",
-        f"<p><i>Duration: {duration_str} | Speakers: {num_speakers}</i></p>",
-        *_summary_html(summary),
-        "<hr>",
-    ]
-    for u in utterances:
-        speaker = u.get("speaker", 0) + 1  # 0-indexed → 1-indexed
-        text = u.get("transcript", "").strip()
-        if text:
-            lines.append(f"<p><b>Speaker {speaker}:</b> {text}</p>")
-    return "\n".join(lines)
+    header = (
+        f"<h1>{escape(title, quote=False)} - {date_str}</h1>\n"
+        f"<p><i>Duration: {duration_str} | Speakers: {num_speakers}</i></p>\n"
+        f"{_summary_html(summary)}<hr>"
+    )
+    body = "\n".join(
+        _SPEAKER_LINE_HTML % (speaker + 1, escape(text, quote=False))  # 0-indexed → 1-indexed
+        for speaker, text in _speaker_turns(utterances)
+    )
+    return f"{header}\n{body}" if body else header
 
 
 def _format_single_speaker(
     utterances: list[dict], title: str, date_str: str, duration_str: str,
     summary: Summary | None = None,
 ) -> str:
-    lines = [
-        f"<h1>{title} - {date_str}</h1>",
-        f"<p><i>Duration: {duration_str}</i></p>",
-        *_summary_html(summary),
-        "<hr>",
-    ]
-    for u in utterances:
-        text = u.get("transcript", "").strip()
-        if text:
-            lines.append(f"<p>{text}</p>")
-    return "\n".join(lines)
+    header = (
+        f"<h1>{escape(title, quote=False)} - {date_str}</h1>\n"
+        f"<p><i>Duration: {duration_str}</i></p>\n"
+        f"{_summary_html(summary)}<hr>"
+    )
+    body = "\n".join(
+        f"<p>{escape(text, quote=False)}</p>" for u in utterances if (text := u.get("transcript", "").strip())
+    )
+    return f"{header}\n{body}" if body else header
 
 
 def _format_plain_text(
     text: str, title: str, date_str: str, duration_str: str,
     summary: Summary | None = None,
 ) -> str:
-    lines = [
-        f"<h1>{title} - {date_str}</h1>",
-        f"<p><i>Duration: {duration_str}</i></p>",
-        *_summary_html(summary),
-        "<hr>",
-    ]
-    for paragraph in text.split("\n"):
-        paragraph = paragraph.strip()
-        if paragraph:
-            lines.append(f"<p>{paragraph}</p>")
-    return "\n".join(lines)
+    header = (
+        f"<h1>{escape(title, quote=False)} - {date_str}</h1>\n"
+        f"<p><i>Duration: {duration_str}</i></p>\n"
+        f"{_summary_html(summary)}<hr>"
+    )
+    body = "\n".join(
+        f"<p>{escape(paragraph, quote=False)}</p>" for line in text.split("\n") if (paragraph := line.strip())
+    )
+    return f"{header}\n{body}" if body else header
 
 
 def format_transcript_markdown(
@@ -135,101 +176,78 @@ def format_transcript_markdown(
     summary: Summary | None = None,
 ) -> str:
     """Convert a Deepgram response into Markdown for file output."""
-    display_title = title or metadata.title
-    date_str = metadata.date.strftime("%b %-d, %Y")
-    duration_str = _format_duration(metadata.duration_seconds)
-    utterances = _get_utterances(response)
+    return render_markdown(prepare_transcript(response, metadata, title, summary))
 
-    if utterances and _count_speakers(utterances) > 1:
-        return _format_multi_speaker_md(utterances, display_title, date_str, duration_str, summary)
-    elif utterances:
-        return _format_single_speaker_md(utterances, display_title, date_str, duration_str, summary)
+
+def render_markdown(t: PreparedTranscript) -> str:
+    if t.num_speakers > 1:
+        return _format_multi_speaker_md(
+            t.utterances, t.display_title, t.date_str, t.duration_str, t.summary, t.num_speakers
+        )
+    elif t.utterances:
+        return _format_single_speaker_md(t.utterances, t.display_title, t.date_str, t.duration_str, t.summary)
     else:
-        text = _get_transcript_text(response)
-        return _format_plain_text_md(text, display_title, date_str, duration_str, summary)
+        return _format_plain_text_md(t.text, t.display_title, t.date_str, t.duration_str, t.summary)
 
 
-def _summary_md(summary: Summary | None) -> list[str]:
+def _summary_md(summary: Summary | None) -> str:
+    """Render the summary block, newline-terminated, or "" when there's no summary."""
     if not summary:
-        return []
+        return ""
     lines = ["", summary.summary]
-    for heading, items in [
-        ("Key Points", summary.key_points),
-        ("Action Items", summary.action_items),
-        ("Decisions", summary.decisions),
-        ("Open Questions", summary.open_questions),
-    ]:
-        if items:
+    for heading, attr in _SUMMARY_SECTIONS:
+        if items := getattr(summary, attr):
             lines.append("")
             lines.append(f"## {heading}")
             lines.append("")
-            for item in items:
-                lines.append(f"- {item}")
+            lines.extend(f"- {item}" for item in items)
     lines.append("")
     lines.append("---")
-    return lines
+    return "\n".join(lines) + "\n"
 
 
 def _format_multi_speaker_md(
     utterances: list[dict], title: str, date_str: str, duration_str: str,
-    summary: Summary | None = None,
+    summary: Summary | None, num_speakers: int,
 ) -> str:
-    num_speakers = _count_speakers(utterances)
-    lines = [
-        f"# {title} - {date_str}",
-        "",
-        f"*Duration: {duration_str} | Speakers: {num_speakers}*",
-        *_summary_md(summary),
-        "",
-        "---",
-        "",
-    ]
-    for u in utterances:
-        speaker = u.get("speaker", 0) + 1
-        text = u.get("transcript", "").strip()
-        if text:
-            lines.append(f"**Speaker {speaker}:** {text}")
-            lines.append("")
-    return "\n".join(lines)
+    header = (
+        f"# {title} - {date_str}\n"
+        f"\n"
+        f"*Duration: {duration_str} | Speakers: {num_speakers}*\n"
+        f"{_summary_md(summary)}\n"
+        f"---\n"
+    )
+    body = "\n\n".join(
+        _SPEAKER_LINE_MD % (speaker + 1, text) for speaker, text in _speaker_turns(utterances)
+    )
+    return f"{header}\n{body}\n" if body else header
 
 
 def _format_single_speaker_md(
     utterances: list[dict], title: str, date_str: str, duration_str: str,
     summary: Summary | None = None,
 ) -> str:
-    lines = [
-        f"# {title} - {date_str}",
-        "",
-        f"*Duration: {duration_str}*",
-        *_summary_md(summary),
-        "",
-        "---",
-        "",
-    ]
-    for u in utterances:
-        text = u.get("transcript", "").strip()
-        if text:
-            lines.append(text)
-            lines.append("")
-    return "\n".join(lines)
+    header = (
+        f"# {title} - {date_str}\n"
+        f"\n"
+        f"*Duration: {duration_str}*\n"
+        f"{_summary_md(summary)}\n"
+        f"---\n"
+    )
+    body = "\n\n".join(text for u in utterances if (text := u.get("transcript", "").strip()))
+    return f"{header}\n{body}\n" if body else header
 
 
 def _format_plain_text_md(
     text: str, title: str, date_str: str, duration_str: str,
     summary: Summary | None = None,
 ) -> str:
-    lines = [
-        f"# {title} - {date_str}",
-        "",
-        f"*Duration: {duration_str}*",
-        *_summary_md(summary),
-        "",
-        "---",
-        "",
-    ]
-    for paragraph in text.split("\n"):
-        paragraph = paragraph.strip()
-        if paragraph:
-            lines.append(paragraph)
-            lines.append("")
-    return "\n".join(lines)
+    header = (
+        f"# {title} - {date_str}\n"
+        f"\n"
+        f"*Duration: {duration_str}*\n"
+        f"{_summary_md(summary)}\n"
+        f"---\n"
+    )
+    body = "\n\n".join(paragraph for line in text.split("\n") if (paragraph := line.strip()))
+    return f"{header}\n{body}\n" if body else header
@@ -1,11 +1,16 @@
 import logging
+import queue
 import sqlite3
-from datetime import datetime, timezone
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_DB_PATH = Path.home() / ".scribe" / "processed.db"
+IN_MEMORY = ":memory:"  # db_path for a throwaway ledger, e.g. in tests
 
 _SCHEMA = """
 CREATE TABLE IF NOT EXISTS processed (
@@ -15,81 +20,247 @@ CREATE TABLE IF NOT EXISTS processed (
     completed_at TEXT,
     error        TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_processed_status ON processed(status);
 """
 
+# Statements are kept as constants so each maps to one prepared statement in
+# the connection's cache, parsed and planned once per process
+_SQL_GET_STATUS = "SELECT status FROM processed WHERE file_path = ?"
+_SQL_MARK_PENDING = "INSERT OR IGNORE INTO processed (file_path, status, created_at) VALUES (?, 'pending', ?)"
+_SQL_MARK_PROCESSING = "UPDATE processed SET status = 'processing' WHERE file_path = ?"
+_SQL_MARK_DONE = "UPDATE processed SET status = 'done', completed_at = ?, error = NULL WHERE file_path = ?"
+_SQL_MARK_FAILED = "UPDATE processed SET status = 'failed', completed_at = ?, error = ? WHERE file_path = ?"
+_SQL_REQUEUE = "UPDATE processed SET status = 'pending' WHERE file_path = ? AND status = 'processing'"
+_SQL_GET_KNOWN = "SELECT file_path FROM processed"
+_SQL_GET_BY_STATUS = "SELECT file_path FROM processed WHERE status = ?"
+_SQL_RESET_FAILED = (
+    "UPDATE processed SET status = 'pending', completed_at = NULL, error = NULL WHERE status = 'failed'"
+)
+
+# Prepared statements kept per connection (sqlite3's default is 128)
+_CACHED_STATEMENTS = 256
+
+# Max queued write groups the writer thread applies per commit
+_WRITE_BATCH = 32
+
+# Attempts at committing a batch while another process (e.g. a --backfill next
+# to the watcher) holds the write lock; each attempt already waits busy_timeout
+_BUSY_RETRIES = 5
+_BUSY_BACKOFF = 0.5  # seconds, doubled per attempt
+
+# A single write: SQL plus the parameter rows passed to executemany
+_Statement = tuple[str, list[tuple]]
+
+
+def _is_busy(error: sqlite3.Error) -> bool:
+    """True if `error` means another connection holds the lock, so retrying can succeed."""
+    return (getattr(error, "sqlite_errorcode", 0) & 0xFF) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+def _now() -> str:
+    """Current UTC time as an ISO 8601 string (second precision)."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+
 
 class Ledger:
-    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
-        db_path.parent.mkdir(parents=True, exist_ok=True)
+    """Tracks the processing status of each recording.
+
+    Writes (mark_*) are queued and applied by a background thread, so callers
+    don't block on commits. Reads flush the queue first, so they always see
+    every write made before them.
+    """
+
+    def __init__(self, db_path: Path | str = DEFAULT_DB_PATH):
         self._db_path = db_path
-        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        in_memory = db_path == IN_MEMORY
+        if not in_memory:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Restrict permissions: owner read/write only. Set before connecting so
+            # SQLite creates the -wal/-shm files with the same mode.
+            db_path.touch(mode=0o600, exist_ok=True)
+            db_path.chmod(0o600)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, cached_statements=_CACHED_STATEMENTS)
         self._conn.row_factory = sqlite3.Row
-        self._conn.execute(_SCHEMA)
-        self._conn.commit()
-        # Restrict permissions: owner read/write only
-        db_path.chmod(0o600)
+        self._lock = threading.Lock()
+        self._configure(in_memory)
+        self._conn.executescript(_SCHEMA)
+
+        # Items are lists of statements (applied together), threading.Events
+        # (flush markers), or None (stop)
+        self._writes: queue.SimpleQueue[list[_Statement] | threading.Event | None] = queue.SimpleQueue()
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._write_loop, name="ledger-writer", daemon=True)
+        self._writer.start()
+
+    def _configure(self, in_memory: bool) -> None:
+        """WAL lets reads proceed alongside writes and makes commits append-only."""
+        if not in_memory:  # in-memory DBs have no journal file to put in WAL mode
+            mode = self._conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if mode.lower() != "wal":
+                logger.warning("Could not enable WAL on %s (journal_mode=%s)", self._db_path, mode)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA cache_size=-8000")
+
+    def _write_loop(self) -> None:
+        """Apply queued writes, committing everything available in one go."""
+        running = True
+        while running:
+            items = [self._writes.get()]
+            while len(items) < _WRITE_BATCH:
+                try:
+                    items.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            groups = []
+            waiters = []
+            for item in items:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    groups.append(item)
+
+            if groups:
+                self._commit_groups(groups)
+            for event in waiters:
+                event.set()
+
+    def _commit_groups(self, groups: list[list[_Statement]]) -> None:
+        """Commit write groups in one transaction, each under its own savepoint.
+
+        A group that fails is rolled back and logged on its own, so other
+        recordings' writes still land. If the DB is locked, the whole
+        transaction is retried with backoff.
+        """
+        last_error = None
+        for attempt in range(_BUSY_RETRIES):
+            with self._lock:
+                try:
+                    self._conn.execute("BEGIN")
+                    for group in groups:
+                        self._conn.execute("SAVEPOINT write_group")
+                        try:
+                            for sql, rows in group:
+                                self._conn.executemany(sql, rows)
+                        except sqlite3.Error as e:
+                            if _is_busy(e):
+                                raise
+                            self._conn.execute("ROLLBACK TO write_group")
+                            logger.error("Ledger write failed, %d statements dropped: %s", len(group), e)
+                        self._conn.execute("RELEASE write_group")
+                    self._conn.commit()
+                    return
+                except sqlite3.Error as e:
+                    self._conn.rollback()
+                    if not _is_busy(e):
+                        logger.error("Ledger commit failed, %d write groups dropped: %s", len(groups), e)
+                        return
+                    last_error = e
+            logger.warning("Ledger is locked, retrying commit (attempt %d/%d)", attempt + 1, _BUSY_RETRIES)
+            time.sleep(_BUSY_BACKOFF * (2 ** attempt))
+        logger.error("Ledger still locked, %d write groups dropped: %s", len(groups), last_error)
+
+    def _write(self, sql: str, rows: list[tuple]) -> None:
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append((sql, rows))
+        else:
+            self._writes.put([(sql, rows)])
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several mark_* calls so they are committed together.
+
+        The writes are queued as one unit on exit, or discarded if the block
+        raises. Reads inside the block don't see its writes yet.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+        self._local.pending = []
+        try:
+            yield
+            pending = self._local.pending
+        finally:
+            self._local.pending = None
+        if pending:
+            self._writes.put(pending)
+
+    def flush(self) -> None:
+        """Block until every write queued so far has been committed."""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._writes.put(done)
+        done.wait()
+
+    def _read(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        self.flush()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_status(self, file_path: str) -> str | None:
+        """Return the recording's status, or None if it isn't in the ledger."""
+        rows = self._read(_SQL_GET_STATUS, (file_path,))
+        return rows[0]["status"] if rows else None
 
     def is_processed(self, file_path: str) -> bool:
-        row = self._conn.execute(
-            "SELECT status FROM processed WHERE file_path = ?", (file_path,)
-        ).fetchone()
-        return row is not None and row["status"] == "done"
+        return self.get_status(file_path) == "done"
 
     def is_known(self, file_path: str) -> bool:
-        row = self._conn.execute(
-            "SELECT 1 FROM processed WHERE file_path = ?", (file_path,)
-        ).fetchone()
-        return row is not None
+        return self.get_status(file_path) is not None
 
     def mark_pending(self, file_path: str) -> None:
-        now = datetime.now(timezone.utc).isoformat()
-        self._conn.execute(
-            "INSERT OR IGNORE INTO processed (file_path, status, created_at) VALUES (?, 'pending', ?)",
-            (file_path, now),
-        )
-        self._conn.commit()
+        self.mark_pending_many((file_path,))
+
+    def mark_pending_many(self, file_paths: Iterable[str]) -> None:
+        """Register many recordings as pending with one executemany in a single commit."""
+        now = _now()
+        self._write(_SQL_MARK_PENDING, [(fp, now) for fp in file_paths])
 
     def mark_processing(self, file_path: str) -> None:
-        self._conn.execute(
-            "UPDATE processed SET status = 'processing' WHERE file_path = ?",
-            (file_path,),
-        )
-        self._conn.commit()
+        self._write(_SQL_MARK_PROCESSING, [(file_path,)])
 
     def mark_done(self, file_path: str) -> None:
-        now = datetime.now(timezone.utc).isoformat()
-        self._conn.execute(
-            "UPDATE processed SET status = 'done', completed_at = ?, error = NULL WHERE file_path = ?",
-            (now, file_path),
-        )
-        self._conn.commit()
+        self._write(_SQL_MARK_DONE, [(_now(), file_path)])
 
     def mark_failed(self, file_path: str, error: str) -> None:
-        now = datetime.now(timezone.utc).isoformat()
-        self._conn.execute(
-            "UPDATE processed SET status = 'failed', completed_at = ?, error = ? WHERE file_path = ?",
-            (now, error, file_path),
-        )
-        self._conn.commit()
+        self._write(_SQL_MARK_FAILED, [(_now(), error, file_path)])
+
+    def requeue(self, file_paths: Iterable[str]) -> None:
+        """Put recordings still marked processing back to pending, e.g. after an interrupted run."""
+        self._write(_SQL_REQUEUE, [(fp,) for fp in file_paths])
+
+    def get_known(self) -> set[str]:
+        rows = self._read(_SQL_GET_KNOWN)
+        return {r["file_path"] for r in rows}
 
     def get_failed(self) -> list[str]:
-        rows = self._conn.execute(
-            "SELECT file_path FROM processed WHERE status = 'failed'"
-        ).fetchall()
+        rows = self._read(_SQL_GET_BY_STATUS, ("failed",))
         return [r["file_path"] for r in rows]
 
     def reset_failed(self) -> int:
-        cursor = self._conn.execute(
-            "UPDATE processed SET status = 'pending', completed_at = NULL, error = NULL WHERE status = 'failed'"
-        )
-        self._conn.commit()
+        # Runs synchronously: callers need the count and the reset rows right away
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(_SQL_RESET_FAILED)
+            self._conn.commit()
         return cursor.rowcount
 
     def get_pending(self) -> list[str]:
-        rows = self._conn.execute(
-            "SELECT file_path FROM processed WHERE status = 'pending'"
-        ).fetchall()
+        rows = self._read(_SQL_GET_BY_STATUS, ("pending",))
         return [r["file_path"] for r in rows]
 
     def close(self) -> None:
+        """Commit outstanding writes, stop the writer thread and close the DB."""
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+        # Refresh query planner statistics before shutdown
+        self._conn.execute("PRAGMA optimize")
         self._conn.close()
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / ".scribe" / "llm_cache.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key        TEXT PRIMARY KEY,
+    content    TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+
+def cache_key(request: dict) -> str:
+    """Hash every request parameter (model, prompt, sampling), so any change is a miss."""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SqliteCache:
+    """Completion text keyed by cache_key(request), so re-runs skip the API call."""
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_PATH):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Cached completions quote transcripts: owner read/write only
+        db_path.touch(mode=0o600, exist_ok=True)
+        db_path.chmod(0o600)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, content: str) -> None:
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, content, created_at) VALUES (?, ?, ?)",
+                (key, content, created_at),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        if self.hits or self.misses:
+            logger.info("Summary cache: %d hits, %d misses", self.hits, self.misses)
+        self._conn.close()
@@ -1,20 +1,35 @@
 import argparse
 import logging
 import os
+import re
 import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from scribe.db import VOICE_MEMOS_DIR, get_recording_metadata
-from scribe.formatter import format_transcript, format_transcript_markdown
+from scribe.db import (
+    VOICE_MEMOS_DIR,
+    RecordingMetadata,
+    get_recording_metadata,
+    get_recording_metadata_batch,
+)
+from scribe.formatter import (
+    _get_transcript_text,
+    _get_utterances,
+    prepare_transcript,
+    render_html,
+    render_markdown,
+)
 from scribe.ledger import Ledger
+from scribe.llm_cache import SqliteCache
+from scribe import notes, summarizer, transcriber
 from scribe.notes import create_note, notify_error
-from scribe.summarizer import summarize
+from scribe.summarizer import Summary, SummarizeJob, summarize, summarize_batch, summarize_many
 from scribe.transcriber import transcribe
-from scribe.watcher import start_watching
+from scribe.watcher import STABLE_WINDOW, start_watching
 
 logger = logging.getLogger("scribe")
 
@@ -24,6 +39,11 @@ LOG_FILE = LOG_DIR / "scribe.log"
 
 KEYTERMS_FILE = Path.home() / ".scribe" / "keyterms.txt"
 
+# Characters dropped from note titles when building markdown filenames
+_UNSAFE_TITLE_CHARS = re.compile(r"[^\w \-]+")
+
+_WRITE_CHUNK_CHARS = 64 * 1024
+
 
 @dataclass
 class Config:
@@ -34,6 +54,12 @@ class Config:
     deepgram_base_url: str | None
     openai_api_key: str | None
     keyterms: list[str]
+    backfill_concurrency: int
+    watch_concurrency: int
+    watch_stable_seconds: float
+    batch_summaries: bool
+    transcode_audio: bool
+    summary_cache: SqliteCache | None = None
 
 
 def _setup_logging() -> None:
@@ -73,68 +99,166 @@ def _load_keyterms() -> list[str]:
 
 def _save_markdown(markdown: str, title: str, date_str: str, output_dir: Path) -> None:
     """Save markdown transcript to the output directory."""
-    safe_title = "".join(c if c.isalnum() or c in " -_" else "" for c in title).strip()
+    safe_title = _UNSAFE_TITLE_CHARS.sub("", title).strip()
     filename = f"{date_str} - {safe_title}.md"
     out_path = output_dir / filename
-    out_path.write_text(markdown, encoding="utf-8")
+    # Encode and write in slices so long transcripts never hold a full
+    # UTF-8 copy of the markdown in memory
+    fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        for start in range(0, len(markdown), _WRITE_CHUNK_CHARS):
+            data = memoryview(markdown[start:start + _WRITE_CHUNK_CHARS].encode("utf-8"))
+            while data:
+                data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
     logger.info("Saved markdown: %s", out_path)
 
 
-def _process_file(file_path: str, ledger: Ledger, cfg: Config) -> None:
-    """Run the full pipeline for a single recording."""
-    if ledger.is_processed(file_path):
-        logger.debug("Already processed, skipping: %s", Path(file_path).name)
+def _warm_up(cfg: Config) -> None:
+    """Build the API clients and compile the Notes script before the first recording arrives.
+
+    Each is cached on first use, so this moves that setup out of the first
+    recording's latency.
+    """
+    transcriber._create_client(cfg.api_key, cfg.deepgram_base_url)
+    if cfg.openai_api_key:
+        summarizer._client(cfg.openai_api_key)
+    notes._get_create_note_script()
+
+
+def _summary_input(response: dict) -> tuple[str, int]:
+    """Flatten a Deepgram response into (transcript text, speaker count) for summarization.
+
+    Multi-speaker transcripts get a "Speaker N:" prefix per turn, merging
+    consecutive utterances by the same speaker. Single-speaker ones use
+    Deepgram's channel transcript, which is already the joined text. Utterances
+    are walked once, collecting speakers and turns together.
+    """
+    utterances = _get_utterances(response)
+    if not utterances:
+        return _get_transcript_text(response), 1
+
+    speakers = set()
+    turns: list[tuple[int, list[str]]] = []
+    for u in utterances:
+        speaker = u.get("speaker", 0)
+        speakers.add(speaker)
+        if text := u.get("transcript", "").strip():
+            if turns and turns[-1][0] == speaker:
+                turns[-1][1].append(text)
+            else:
+                turns.append((speaker, [text]))
+
+    if len(speakers) > 1:
+        return " ".join([f"Speaker {speaker + 1}: {' '.join(texts)}" for speaker, texts in turns]), len(speakers)
+    text = _get_transcript_text(response) or " ".join([text for _, texts in turns for text in texts])
+    return text, len(speakers)
+
+
+def _process_file(
+    file_path: str,
+    ledger: Ledger,
+    cfg: Config,
+    prefetched: dict[str, RecordingMetadata] | None = None,
+) -> None:
+    """Run the full pipeline for a single recording.
+
+    `prefetched` holds metadata already looked up in bulk; recordings missing
+    from it are looked up individually.
+    """
+    transcribed = _transcribe_recording(file_path, ledger, cfg, prefetched)
+    if transcribed is None:
         return
+    metadata, response = transcribed
+    generated_summary = _summarize_recording(response, metadata, cfg)
+    _publish_recording(file_path, ledger, cfg, metadata, response, generated_summary)
 
-    if not ledger.is_known(file_path):
-        ledger.mark_pending(file_path)
 
-    ledger.mark_processing(file_path)
+def _fail(file_path: str, ledger: Ledger, e: Exception) -> None:
     name = Path(file_path).name
+    error_msg = str(e)
+    ledger.mark_failed(file_path, error_msg)
+    logger.error("Failed to process %s: %s", name, error_msg)
+    notify_error(f"Failed: {name}")
+
+
+def _transcribe_recording(
+    file_path: str,
+    ledger: Ledger,
+    cfg: Config,
+    prefetched: dict[str, RecordingMetadata] | None = None,
+) -> tuple[RecordingMetadata, dict] | None:
+    """Mark a recording as processing, then look up its metadata and transcribe it.
+
+    Returns None if it was already processed or failed (and was marked so).
+    """
+    status = ledger.get_status(file_path)
+    if status == "done":
+        logger.debug("Already processed, skipping: %s", Path(file_path).name)
+        return None
+
+    with ledger.transaction():
+        if status is None:
+            ledger.mark_pending(file_path)
+        ledger.mark_processing(file_path)
 
     try:
-        # 1. Get metadata
-        metadata = get_recording_metadata(file_path)
-        logger.info("Processing: %s (%s)", metadata.title, name)
-
-        # 2. Transcribe
-        response = transcribe(cfg.api_key, file_path, base_url=cfg.deepgram_base_url, keyterms=cfg.keyterms)
-
-        # 3. Summarize (optional — requires OPENAI_API_KEY)
-        generated_summary = None
-        if cfg.openai_api_key:
-            try:
-                from scribe.formatter import _get_utterances, _count_speakers, _get_transcript_text
-
-                utterances = _get_utterances(response)
-                if utterances:
-                    speaker_count = _count_speakers(utterances)
-                    if speaker_count > 1:
-                        transcript_text = " ".join(
-                            f"Speaker {u.get('speaker', 0) + 1}: {u.get('transcript', '').strip()}"
-                            for u in utterances if u.get("transcript", "").strip()
-                        )
-                    else:
-                        transcript_text = " ".join(
-                            u.get("transcript", "").strip() for u in utterances if u.get("transcript", "").strip()
-                        )
-                else:
-                    transcript_text = _get_transcript_text(response)
-                    speaker_count = 1
-
-                if transcript_text:
-                    generated_summary = summarize(
-                        transcript_text, metadata.duration_seconds, speaker_count,
-                        cfg.openai_api_key, keyterms=cfg.keyterms or None,
-                    )
-                    logger.info("Generated title: %s", generated_summary.title)
-            except Exception as e:
-                logger.warning("Summarization failed, using original title: %s", e)
+        # 1. Get metadata. A fresh recording's DB row may not be committed yet,
+        # and the lookup can spend seconds retrying; it doesn't depend on the
+        # transcript, so run it alongside the Deepgram upload.
+        metadata = (prefetched or {}).get(file_path)
+        with ThreadPoolExecutor(max_workers=1) as lookup:
+            metadata_future = None if metadata else lookup.submit(get_recording_metadata, file_path)
+
+            # 2. Transcribe
+            response = transcribe(
+                cfg.api_key, file_path, base_url=cfg.deepgram_base_url, keyterms=cfg.keyterms,
+                transcode=cfg.transcode_audio,
+            )
+            if metadata_future is not None:
+                metadata = metadata_future.result()
+        logger.info("Transcribed: %s (%s)", metadata.title, Path(file_path).name)
+        return metadata, response
+    except Exception as e:
+        _fail(file_path, ledger, e)
+        return None
+
 
+def _summarize_recording(response: dict, metadata: RecordingMetadata, cfg: Config) -> Summary | None:
+    """3. Summarize (optional — requires OPENAI_API_KEY). Returns None when skipped or failed."""
+    if not cfg.openai_api_key:
+        return None
+    try:
+        transcript_text, speaker_count = _summary_input(response)
+        if not transcript_text:
+            return None
+        generated_summary = summarize(
+            transcript_text, metadata.duration_seconds, speaker_count,
+            cfg.openai_api_key, keyterms=cfg.keyterms or None, cache=cfg.summary_cache,
+        )
+        logger.info("Generated title: %s", generated_summary.title)
+        return generated_summary
+    except Exception as e:
+        logger.warning("Summarization failed, using original title: %s", e)
+        return None
+
+
+def _publish_recording(
+    file_path: str,
+    ledger: Ledger,
+    cfg: Config,
+    metadata: RecordingMetadata,
+    response: dict,
+    generated_summary: Summary | None,
+) -> None:
+    """Format a transcribed recording, save it to Apple Notes and disk, and mark it done."""
+    try:
         # 4. Format
         note_title = generated_summary.title if generated_summary else metadata.title
         generated_title = generated_summary.title if generated_summary else None
-        html = format_transcript(response, metadata, title=generated_title, summary=generated_summary)
+        prepared = prepare_transcript(response, metadata, title=generated_title, summary=generated_summary)
+        html = render_html(prepared)
 
         # 5. Save to Apple Notes
         success = create_note(note_title, html, folder=cfg.notes_folder, account=cfg.notes_account)
@@ -143,9 +267,7 @@ def _process_file(file_path: str, ledger: Ledger, cfg: Config) -> None:
 
         # 6. Save markdown to output directory
         if cfg.output_dir:
-            markdown = format_transcript_markdown(
-                response, metadata, title=generated_title, summary=generated_summary
-            )
+            markdown = render_markdown(prepared)
             date_str = metadata.date.strftime("%Y-%m-%d")
             _save_markdown(markdown, note_title, date_str, cfg.output_dir)
 
@@ -154,26 +276,82 @@ def _process_file(file_path: str, ledger: Ledger, cfg: Config) -> None:
         logger.info("Done: %s", note_title)
 
     except Exception as e:
-        error_msg = str(e)
-        ledger.mark_failed(file_path, error_msg)
-        logger.error("Failed to process %s: %s", name, error_msg)
-        notify_error(f"Failed: {name}")
+        _fail(file_path, ledger, e)
+
+
+def _process_with_batch_summaries(
+    pending: list[str],
+    ledger: Ledger,
+    cfg: Config,
+    prefetched: dict[str, RecordingMetadata],
+) -> None:
+    """Backfill variant that transcribes everything, then summarizes in one Batch API job.
+
+    Recordings not yet published when this returns or raises (e.g. interrupted
+    while the batch is polled) are put back to pending so the next backfill
+    picks them up, instead of staying "processing" for good.
+    """
+    try:
+        with ThreadPoolExecutor(max_workers=cfg.backfill_concurrency) as executor:
+            transcribed = [
+                (fp, result)
+                for fp, result in zip(
+                    pending,
+                    executor.map(lambda fp: _transcribe_recording(fp, ledger, cfg, prefetched), pending),
+                )
+                if result is not None
+            ]
+
+        jobs = []
+        for fp, (metadata, response) in transcribed:
+            transcript_text, speaker_count = _summary_input(response)
+            if transcript_text:
+                jobs.append(SummarizeJob(
+                    custom_id=fp,
+                    transcript_text=transcript_text,
+                    duration_seconds=metadata.duration_seconds,
+                    speaker_count=speaker_count,
+                    keyterms=cfg.keyterms or None,
+                ))
+        try:
+            summaries = summarize_batch(jobs, cfg.openai_api_key, cache=cfg.summary_cache)
+        except Exception as e:
+            logger.warning("Batch summarization failed, summarizing individually: %s", e)
+            summaries = {}
+
+        # Whatever the batch didn't return is summarized right away, concurrently
+        missing = [job for job in jobs if job.custom_id not in summaries]
+        if missing:
+            summaries.update(summarize_many(missing, cfg.openai_api_key, cache=cfg.summary_cache))
+
+        def publish(fp: str, metadata: RecordingMetadata, response: dict) -> None:
+            _publish_recording(fp, ledger, cfg, metadata, response, summaries.get(fp))
+
+        with ThreadPoolExecutor(max_workers=cfg.backfill_concurrency) as executor:
+            list(executor.map(lambda item: publish(item[0], *item[1]), transcribed))
+    finally:
+        ledger.requeue(pending)
 
 
 def _backfill(ledger: Ledger, cfg: Config) -> None:
     """Process all existing Voice Memos recordings that haven't been processed."""
-    watch_dir = str(VOICE_MEMOS_DIR)
-    m4a_files = sorted(Path(watch_dir).glob("*.m4a"))
-    new_count = 0
-    for f in m4a_files:
-        fp = str(f)
-        if not ledger.is_known(fp):
-            ledger.mark_pending(fp)
-            new_count += 1
-    logger.info("Backfill: found %d new recordings out of %d total", new_count, len(m4a_files))
+    with os.scandir(VOICE_MEMOS_DIR) as it:
+        m4a_files = sorted(e.path for e in it if e.name.endswith(".m4a") and e.is_file())
+    known = ledger.get_known()
+    new_files = [fp for fp in m4a_files if fp not in known]
+    ledger.mark_pending_many(new_files)
+    logger.info("Backfill: found %d new recordings out of %d total", len(new_files), len(m4a_files))
+
+    pending = ledger.get_pending()
+    prefetched = get_recording_metadata_batch(pending)
+    if cfg.batch_summaries and cfg.openai_api_key:
+        _process_with_batch_summaries(pending, ledger, cfg, prefetched)
+        return
 
-    for fp in ledger.get_pending():
-        _process_file(fp, ledger, cfg)
+    # The pipeline is dominated by network and AppleScript waits, so recordings
+    # are processed concurrently. _process_file handles its own errors.
+    with ThreadPoolExecutor(max_workers=cfg.backfill_concurrency) as executor:
+        list(executor.map(lambda fp: _process_file(fp, ledger, cfg, prefetched), pending))
 
 
 def _retry_failed(ledger: Ledger, cfg: Config) -> None:
@@ -188,6 +366,10 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Scribe: Voice Memos → Apple Notes")
     parser.add_argument("--backfill", action="store_true", help="Process all existing recordings")
     parser.add_argument("--retry-failed", action="store_true", help="Retry previously failed recordings")
+    parser.add_argument(
+        "--batch-summaries", action="store_true",
+        help="With --backfill, summarize via the OpenAI Batch API (half price, may take hours)",
+    )
     args = parser.parse_args()
 
     load_dotenv()
@@ -219,6 +401,12 @@ def main() -> None:
         deepgram_base_url=os.getenv("DEEPGRAM_BASE_URL"),
         openai_api_key=openai_api_key,
         keyterms=keyterms,
+        backfill_concurrency=max(1, int(os.getenv("SCRIBE_BACKFILL_CONCURRENCY", "4"))),
+        watch_concurrency=max(1, int(os.getenv("SCRIBE_MAX_CONCURRENT", "3"))),
+        watch_stable_seconds=max(0.0, float(os.getenv("SCRIBE_STABLE_SECONDS", str(STABLE_WINDOW)))),
+        batch_summaries=args.batch_summaries,
+        transcode_audio=os.getenv("SCRIBE_TRANSCODE", "").lower() in ("1", "true", "yes"),
+        summary_cache=SqliteCache() if openai_api_key else None,
     )
 
     if cfg.deepgram_base_url:
@@ -232,26 +420,39 @@ def main() -> None:
 
     ledger = Ledger()
 
-    if args.backfill:
-        _backfill(ledger, cfg)
-        return
-
-    if args.retry_failed:
-        _retry_failed(ledger, cfg)
+    def close() -> None:
+        ledger.close()
+        if cfg.summary_cache:
+            cfg.summary_cache.close()
+
+    if args.backfill or args.retry_failed:
+        try:
+            if args.backfill:
+                _backfill(ledger, cfg)
+            else:
+                _retry_failed(ledger, cfg)
+        finally:
+            close()
         return
 
     # Watch mode: run until interrupted
+    _warm_up(cfg)
+
     def on_new_recording(file_path: str) -> None:
         _process_file(file_path, ledger, cfg)
 
-    observer = start_watching(watch_dir, on_new_recording)
+    # Recordings that finish close together are processed in parallel
+    executor = ThreadPoolExecutor(max_workers=cfg.watch_concurrency, thread_name_prefix="recording")
+    observer = start_watching(watch_dir, on_new_recording, executor, cfg.watch_stable_seconds)
 
     # Graceful shutdown
     def shutdown(signum, frame):
         logger.info("Shutting down...")
         observer.stop()
         observer.join()
-        ledger.close()
+        # Let in-flight recordings finish so they aren't left as "processing"
+        executor.shutdown(wait=True)
+        close()
         sys.exit(0)
 
     signal.signal(signal.SIGINT, shutdown)
@@ -1,36 +1,51 @@
 import logging
 import subprocess
 import tempfile
+import threading
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+CREATE_NOTE_SOURCE = Path(__file__).with_name("create_note.applescript")
+COMPILED_SCRIPT_DIR = Path.home() / ".scribe"
+
+# Bodies up to this size are passed to osascript as an argument; larger ones
+# go through a temp file to stay well clear of the ARG_MAX limit (1 MiB)
+INLINE_BODY_MAX_CHARS = 64 * 1024
+
+# Script passed to osascript for create_note, resolved on first use
+_create_note_script: Path | None = None
+_create_note_lock = threading.Lock()
+
+# Backslash and quote escapes for AppleScript string literals, applied in one pass
+_APPLESCRIPT_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+# (folder, account) pairs confirmed to exist this process
+_known_folders: set[tuple[str, str]] = set()
+_known_folders_lock = threading.Lock()
+
 
 def create_note(title: str, html_body: str, folder: str = "Scribe", account: str = "iCloud") -> bool:
     """Create a note in Apple Notes via osascript.
 
-    Writes HTML to a temp file to avoid AppleScript string injection issues
-    from transcript content containing quotes or backslashes.
+    All values are passed as script arguments, so transcript content is
+    never parsed as AppleScript. Large bodies are handed over in a temp file.
     """
     _ensure_folder(folder, account)
+    script_path = _get_create_note_script()
 
     tmp = None
     try:
-        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False)
-        tmp.write(html_body)
-        tmp.close()
-
-        script = f'''
-            set htmlFile to POSIX file "{tmp.name}"
-            set htmlContent to read htmlFile as «class utf8»
-            tell application "Notes"
-                tell account "{account}"
-                    make new note at folder "{folder}" with properties {{name:"{_escape_applescript(title)}", body:htmlContent}}
-                end tell
-            end tell
-        '''
+        if len(html_body) <= INLINE_BODY_MAX_CHARS:
+            body_args = ["html", html_body]
+        else:
+            tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False)
+            tmp.write(html_body)
+            tmp.close()
+            body_args = ["file", tmp.name]
+
         result = subprocess.run(
-            ["/usr/bin/osascript", "-e", script],
+            ["/usr/bin/osascript", str(script_path), title, folder, account, *body_args],
             capture_output=True, text=True, timeout=30,
         )
         if result.returncode != 0:
@@ -51,8 +66,39 @@ def create_note(title: str, html_body: str, folder: str = "Scribe", account: str
             Path(tmp.name).unlink(missing_ok=True)
 
 
+def _get_create_note_script() -> Path:
+    """Return the compiled create_note script, compiling it on first use.
+
+    osascript loads a compiled .scpt directly instead of parsing and
+    compiling source on every note. Falls back to the source file (which
+    osascript also accepts) if osacompile fails.
+    """
+    global _create_note_script
+    with _create_note_lock:
+        if _create_note_script is not None:
+            return _create_note_script
+        compiled = COMPILED_SCRIPT_DIR / "create_note.scpt"
+        try:
+            if not compiled.exists() or compiled.stat().st_mtime < CREATE_NOTE_SOURCE.stat().st_mtime:
+                COMPILED_SCRIPT_DIR.mkdir(parents=True, exist_ok=True)
+                subprocess.run(
+                    ["/usr/bin/osacompile", "-o", str(compiled), str(CREATE_NOTE_SOURCE)],
+                    capture_output=True, text=True, timeout=15, check=True,
+                )
+            _create_note_script = compiled
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning("Could not compile %s, running it from source: %s", CREATE_NOTE_SOURCE.name, e)
+            _create_note_script = CREATE_NOTE_SOURCE
+        return _create_note_script
+
+
 def _ensure_folder(folder: str, account: str) -> None:
-    """Create the target folder in Apple Notes if it doesn't exist."""
+    """Create the target folder in Apple Notes if it doesn't exist.
+
+    Each folder is checked at most once per process, saving an osascript
+    launch for every note after the first. The lock is held across the
+    check so concurrent workers can't each create the same folder.
+    """
     script = f'''
         tell application "Notes"
             tell account "{account}"
@@ -62,15 +108,20 @@ def _ensure_folder(folder: str, account: str) -> None:
             end tell
         end tell
     '''
-    subprocess.run(
-        ["/usr/bin/osascript", "-e", script],
-        capture_output=True, text=True, timeout=15,
-    )
+    with _known_folders_lock:
+        if (folder, account) in _known_folders:
+            return
+        result = subprocess.run(
+            ["/usr/bin/osascript", "-e", script],
+            capture_output=True, text=True, timeout=15,
+        )
+        if result.returncode == 0:
+            _known_folders.add((folder, account))
 
 
 def _escape_applescript(s: str) -> str:
     """Escape a string for safe use inside AppleScript double quotes."""
-    return s.replace("\\", "\\\\").replace('"', '\\"')
+    return s.translate(_APPLESCRIPT_ESCAPES)
 
 
 def notify_error(message: str) -> None:
@@ -1,20 +1,121 @@
+import asyncio
+import functools
+import importlib.util
 import json
 import logging
-from dataclasses import dataclass
+import re
+import string
+import time
+from dataclasses import dataclass, field
 
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultHttpxClient, OpenAI
+
+from scribe.llm_cache import SqliteCache, cache_key
 
 logger = logging.getLogger(__name__)
 
+MODEL = "gpt-4.1"
+TEMPERATURE = 0.3
+LONG_RECORDING_SECONDS = 300  # longer recordings get more key points and tokens
+MAX_TOKENS = 1500
+MAX_TOKENS_LONG = 2500
+TITLE_MAX_CHARS = 60
 
-@dataclass
+# Outermost {...} of a completion, skipping code fences or prose around it
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+# Summarization prompt. The parts that only depend on voice note vs. meeting
+# are filled in once below; _build_request substitutes the per-transcript rest.
+_PROMPT = string.Template(
+    "You are an expert analyst summarizing a $context. "
+    "Duration: $duration_min minutes. Speakers: $speaker_count.\n"
+    "$keyterms_line\n"
+    "Transcript:\n$transcript\n\n"
+    "Your job is to extract the SALIENT POINTS — the concrete, specific "
+    "information that someone would actually want to reference later. "
+    "Think about what makes this $note_type worth remembering.\n\n"
+    "Examples of salient points (extract whatever applies):\n"
+    "- Specific plans, schedules, dates, or timelines agreed upon\n"
+    "- Names, places, recommendations, or references mentioned\n"
+    "- Numbers, amounts, prices, or quantities discussed\n"
+    "- Opinions, preferences, or positions expressed by participants\n"
+    "- Problems identified and solutions proposed\n"
+    "- Commitments or promises made\n\n"
+    "Rules:\n"
+    "- summary: A rich 3-5 sentence synopsis that captures the substance "
+    "of the $note_type, not just the topic. Include specifics.\n"
+    "- key_points: $key_points_range specific, concrete bullet points. Each should "
+    "contain real information from the conversation — names, dates, "
+    "numbers, specifics. Never write vague points like 'discussed the project'.\n"
+    "$meeting_instruction"
+    "- action_items: concrete next-steps with owners and deadlines if mentioned. Empty list if none.\n"
+    "- decisions: explicit decisions or agreements reached. Empty list if none.\n"
+    "- open_questions: unresolved questions or disagreements. Empty list if none.\n"
+    "- If a name sounds garbled or unclear, include your best guess with [?] appended.\n\n"
+    "Respond with JSON only, no markdown formatting.\n"
+    '{"title": "concise descriptive title (max $title_max_chars chars)", '
+    '"summary": "3-5 sentence substantive summary", '
+    '"key_points": ["specific point with concrete details", ...], '
+    '"action_items": ["action with owner/deadline if known", ...], '
+    '"decisions": ["specific decision or agreement", ...], '
+    '"open_questions": ["unresolved question", ...]}'
+)
+
+# Keyed by is_meeting (more than one speaker)
+_PROMPT_VARIANTS = {
+    False: string.Template(_PROMPT.safe_substitute(
+        context="voice note",
+        note_type="voice note",
+        meeting_instruction="",
+        title_max_chars=TITLE_MAX_CHARS,
+    )),
+    True: string.Template(_PROMPT.safe_substitute(
+        context="meeting transcript",
+        note_type="meeting",
+        meeting_instruction=(
+            "You MUST capture every person mentioned by name and their associated "
+            "update, task, or status as separate key points. Do not skip anyone.\n"
+        ),
+        title_max_chars=TITLE_MAX_CHARS,
+    )),
+}
+
+# HTTP/2 multiplexes concurrent backfill requests over one connection, but
+# httpx needs the optional h2 package for it (pip install "httpx[http2]")
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+MAX_CONCURRENT_SUMMARIES = 8  # in-flight requests for summarize_many
+
+BATCH_POLL_INTERVAL = 30.0  # seconds between Batch API status checks
+_BATCH_FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+@dataclass(slots=True, frozen=True)
 class Summary:
     title: str
     summary: str
-    key_points: list[str]
-    action_items: list[str]
-    decisions: list[str]
-    open_questions: list[str]
+    key_points: list[str] = field(default_factory=list)
+    action_items: list[str] = field(default_factory=list)
+    decisions: list[str] = field(default_factory=list)
+    open_questions: list[str] = field(default_factory=list)
+
+
+@dataclass
+class SummarizeJob:
+    """One transcript to summarize via summarize_batch or summarize_many."""
+    custom_id: str
+    transcript_text: str
+    duration_seconds: float
+    speaker_count: int
+    keyterms: list[str] | None = None
+
+
+@functools.lru_cache(maxsize=4)
+def _client(api_key: str) -> OpenAI:
+    """Shared client per API key, so its connection pool stays warm between calls."""
+    if _HTTP2_AVAILABLE:
+        return OpenAI(api_key=api_key, http_client=DefaultHttpxClient(http2=True))
+    return OpenAI(api_key=api_key)
 
 
 def summarize(
@@ -23,94 +124,214 @@ def summarize(
     speaker_count: int,
     api_key: str,
     keyterms: list[str] | None = None,
+    cache: SqliteCache | None = None,
 ) -> Summary:
     """Generate a title and summary from transcript text using GPT-4o.
 
-    Returns a Summary with the generated title and summary text.
+    Returns a Summary with the generated title and summary text. With a
+    `cache`, an identical earlier request is answered without an API call.
     Raises on API errors — caller is responsible for fallback.
     """
-    is_meeting = speaker_count > 1
-    if is_meeting:
-        context = "meeting transcript"
-        note_type = "meeting"
+    request = _build_request(transcript_text, duration_seconds, speaker_count, keyterms)
+    key = cache_key(request) if cache else None
+    if cache and (content := cache.get(key)) is not None:
+        logger.debug("Summary cache hit")
+        return _parse_summary(content)
+
+    response = _client(api_key).chat.completions.create(**request)
+    content = response.choices[0].message.content
+    summary = _parse_summary(content)
+    if cache:
+        cache.put(key, content)
+    return summary
+
+
+async def summarize_async(
+    transcript_text: str,
+    duration_seconds: float,
+    speaker_count: int,
+    api_key: str,
+    keyterms: list[str] | None = None,
+    cache: SqliteCache | None = None,
+    client: AsyncOpenAI | None = None,
+) -> Summary:
+    """Async variant of summarize. Pass `client` to share one connection pool across calls."""
+    request = _build_request(transcript_text, duration_seconds, speaker_count, keyterms)
+    key = cache_key(request) if cache else None
+    if cache and (content := cache.get(key)) is not None:
+        logger.debug("Summary cache hit")
+        return _parse_summary(content)
+
+    if client is None:
+        async with AsyncOpenAI(api_key=api_key) as own_client:
+            response = await own_client.chat.completions.create(**request)
     else:
-        context = "voice note"
-        note_type = "voice note"
+        response = await client.chat.completions.create(**request)
+    content = response.choices[0].message.content
+    summary = _parse_summary(content)
+    if cache:
+        cache.put(key, content)
+    return summary
+
+
+def summarize_many(
+    jobs: list[SummarizeJob],
+    api_key: str,
+    concurrency: int = MAX_CONCURRENT_SUMMARIES,
+    cache: SqliteCache | None = None,
+) -> dict[str, Summary]:
+    """Summarize many transcripts concurrently, at most `concurrency` requests at a time.
+
+    Returns summaries keyed by custom_id; failed jobs are logged and missing.
+    """
+    if not jobs:
+        return {}
+    return asyncio.run(_summarize_many(jobs, api_key, concurrency, cache))
+
+
+async def _summarize_many(
+    jobs: list[SummarizeJob],
+    api_key: str,
+    concurrency: int,
+    cache: SqliteCache | None,
+) -> dict[str, Summary]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(client: AsyncOpenAI, job: SummarizeJob) -> Summary | None:
+        async with semaphore:
+            try:
+                return await summarize_async(
+                    job.transcript_text, job.duration_seconds, job.speaker_count, api_key,
+                    keyterms=job.keyterms, cache=cache, client=client,
+                )
+            except Exception as e:
+                logger.warning("Summary failed for %s: %s", job.custom_id, e)
+                return None
 
+    async with AsyncOpenAI(api_key=api_key) as client:
+        summaries = await asyncio.gather(*(run(client, job) for job in jobs))
+    return {job.custom_id: s for job, s in zip(jobs, summaries) if s is not None}
+
+
+def _build_request(
+    transcript_text: str,
+    duration_seconds: float,
+    speaker_count: int,
+    keyterms: list[str] | None = None,
+) -> dict:
+    """Build the chat completion parameters for summarizing one transcript."""
     duration_min = int(duration_seconds / 60)
-    is_long = duration_seconds > 300  # >5 min
+    is_long = duration_seconds > LONG_RECORDING_SECONDS
 
     key_points_range = "5-15" if is_long else "3-8"
-    max_tokens = 2500 if is_long else 1500
+    max_tokens = MAX_TOKENS_LONG if is_long else MAX_TOKENS
 
     keyterms_line = ""
     if keyterms:
         keyterms_line = f"\nKnown people and terms for reference: {', '.join(keyterms)}\n"
 
-    meeting_instruction = ""
-    if is_meeting:
-        meeting_instruction = (
-            "You MUST capture every person mentioned by name and their associated "
-            "update, task, or status as separate key points. Do not skip anyone.\n"
-        )
-
-    prompt = (
-        f"You are an expert analyst summarizing a {context}. "
-        f"Duration: {duration_min} minutes. Speakers: {speaker_count}.\n"
-        f"{keyterms_line}\n"
-        f"Transcript:\n{transcript_text}\n\n"
-        f"Your job is to extract the SALIENT POINTS — the concrete, specific "
-        f"information that someone would actually want to reference later. "
-        f"Think about what makes this {note_type} worth remembering.\n\n"
-        f"Examples of salient points (extract whatever applies):\n"
-        f"- Specific plans, schedules, dates, or timelines agreed upon\n"
-        f"- Names, places, recommendations, or references mentioned\n"
-        f"- Numbers, amounts, prices, or quantities discussed\n"
-        f"- Opinions, preferences, or positions expressed by participants\n"
-        f"- Problems identified and solutions proposed\n"
-        f"- Commitments or promises made\n\n"
-        f"Rules:\n"
-        f"- summary: A rich 3-5 sentence synopsis that captures the substance "
-        f"of the {note_type}, not just the topic. Include specifics.\n"
-        f"- key_points: {key_points_range} specific, concrete bullet points. Each should "
-        f"contain real information from the conversation — names, dates, "
-        f"numbers, specifics. Never write vague points like 'discussed the project'.\n"
-        f"{meeting_instruction}"
-        f"- action_items: concrete next-steps with owners and deadlines if mentioned. Empty list if none.\n"
-        f"- decisions: explicit decisions or agreements reached. Empty list if none.\n"
-        f"- open_questions: unresolved questions or disagreements. Empty list if none.\n"
-        f"- If a name sounds garbled or unclear, include your best guess with [?] appended.\n\n"
-        f"Respond with JSON only, no markdown formatting.\n"
-        f'{{"title": "concise descriptive title (max 60 chars)", '
-        f'"summary": "3-5 sentence substantive summary", '
-        f'"key_points": ["specific point with concrete details", ...], '
-        f'"action_items": ["action with owner/deadline if known", ...], '
-        f'"decisions": ["specific decision or agreement", ...], '
-        f'"open_questions": ["unresolved question", ...]}}'
+    prompt = _PROMPT_VARIANTS[speaker_count > 1].substitute(
+        duration_min=duration_min,
+        speaker_count=speaker_count,
+        keyterms_line=keyterms_line,
+        transcript=transcript_text,
+        key_points_range=key_points_range,
     )
 
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-        max_tokens=max_tokens,
-    )
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": TEMPERATURE,
+        "max_tokens": max_tokens,
+        # JSON mode: the reply is a bare object, no fences or prose. The
+        # prompt must mention JSON for the API to accept this.
+        "response_format": {"type": "json_object"},
+    }
 
-    content = response.choices[0].message.content.strip()
-    # Strip markdown code fences if present
-    if content.startswith("```"):
-        content = content.split("\n", 1)[1] if "\n" in content else content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
 
-    parsed = json.loads(content)
+def _parse_summary(content: str) -> Summary:
+    # JSON mode replies are bare objects; the search is a defensive fallback
+    # for fenced or chatty replies
+    match = _JSON_OBJECT.search(content)
+    parsed = json.loads(match.group() if match else content)
     return Summary(
-        title=parsed["title"][:60],
+        title=parsed["title"][:TITLE_MAX_CHARS],
         summary=parsed["summary"],
         key_points=parsed.get("key_points", []),
         action_items=parsed.get("action_items", []),
         decisions=parsed.get("decisions", []),
         open_questions=parsed.get("open_questions", []),
     )
+
+
+def summarize_batch(
+    jobs: list[SummarizeJob],
+    api_key: str,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    cache: SqliteCache | None = None,
+) -> dict[str, Summary]:
+    """Summarize many transcripts through the OpenAI Batch API.
+
+    Batch requests cost half as much as synchronous ones but may take up to
+    the 24h completion window, so this is only for non-interactive runs.
+    Blocks until the batch finishes. Returns summaries keyed by custom_id;
+    jobs that failed are missing and the caller should fall back for them.
+    Jobs answered by `cache` aren't submitted.
+    """
+    results = {}
+    keys = {}
+    lines = []
+    for job in jobs:
+        body = _build_request(job.transcript_text, job.duration_seconds, job.speaker_count, job.keyterms)
+        if cache:
+            keys[job.custom_id] = key = cache_key(body)
+            if (content := cache.get(key)) is not None:
+                results[job.custom_id] = _parse_summary(content)
+                continue
+        lines.append(json.dumps({
+            "custom_id": job.custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        }))
+    if not lines:
+        return results
+
+    client = _client(api_key)
+    input_file = client.files.create(
+        file=("summaries.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    logger.info("Submitted summary batch %s with %d requests", batch.id, len(lines))
+
+    while batch.status not in _BATCH_FINAL_STATES:
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        logger.warning("Summary batch %s ended with status %s", batch.id, batch.status)
+        return results
+
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record.get("custom_id")
+        try:
+            response = record["response"]
+            if response["status_code"] != 200:
+                raise ValueError(f"status {response['status_code']}")
+            content = response["body"]["choices"][0]["message"]["content"]
+            results[custom_id] = _parse_summary(content)
+            if cache:
+                cache.put(keys[custom_id], content)
+        except Exception as e:
+            logger.warning("Batch summary failed for %s: %s", custom_id, e)
+
+    logger.info("Summary batch %s: %d/%d succeeded", batch.id, len(results), len(jobs))
+    return results
@@ -1,17 +1,36 @@
+import functools
 import logging
+import os
+import random
+import shutil
+import subprocess
+import tempfile
 import time
+from collections.abc import Iterator
 from pathlib import Path
 
+import httpx
 from deepgram import DeepgramClient
+from deepgram.core import ApiError
 from deepgram.environment import DeepgramClientEnvironment
 
 logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
 INITIAL_BACKOFF = 2.0  # seconds
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60.0  # seconds; longer Retry-After values are clamped so workers aren't parked
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # bytes read per upload chunk
 
+# Optional Opus re-encode before upload; 16 kbps mono is ample for speech
+TRANSCODE_MIN_BYTES = 5 * 1024 * 1024  # smaller files upload quickly as-is
+TRANSCODE_BITRATE = "16k"
+TRANSCODE_TIMEOUT = 600  # seconds
 
+
+@functools.lru_cache(maxsize=4)
 def _create_client(api_key: str, base_url: str | None = None) -> DeepgramClient:
+    """Shared client per key and server, so its connection pool stays warm between calls."""
     # SDK v5 has telemetry opt-out enabled by default (telemetry_opt_out=True)
     kwargs = {"api_key": api_key}
     if base_url:
@@ -21,35 +40,117 @@ def _create_client(api_key: str, base_url: str | None = None) -> DeepgramClient:
     return DeepgramClient(**kwargs)
 
 
+def _retry_delay(error: Exception, attempt: int) -> float | None:
+    """Seconds to wait before retrying after `error`, or None if it isn't transient."""
+    if isinstance(error, ApiError):
+        if error.status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        retry_after = (error.headers or {}).get("retry-after")
+        if retry_after:
+            try:
+                return min(max(0.0, float(retry_after)), MAX_RETRY_AFTER)
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+    elif not isinstance(error, httpx.TransportError):  # connection errors and timeouts
+        return None
+    # Jittered so concurrent backfill workers don't retry in lockstep
+    return INITIAL_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _transcode_to_opus(file_path: str) -> Path | None:
+    """Re-encode a recording to low-bitrate Opus for a smaller upload.
+
+    Returns the path of a temp .ogg file the caller must delete, or None when
+    the file is small, ffmpeg isn't installed, or encoding fails.
+    """
+    if Path(file_path).stat().st_size < TRANSCODE_MIN_BYTES:
+        return None
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        logger.debug("ffmpeg not found, uploading %s as-is", Path(file_path).name)
+        return None
+
+    fd, out_name = tempfile.mkstemp(suffix=".ogg")
+    os.close(fd)
+    out_path = Path(out_name)
+    try:
+        subprocess.run(
+            [
+                ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", file_path,
+                "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", TRANSCODE_BITRATE,
+                "-application", "voip", str(out_path),
+            ],
+            capture_output=True, text=True, timeout=TRANSCODE_TIMEOUT, check=True,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("Opus transcode failed for %s, uploading original: %s", Path(file_path).name, e)
+        out_path.unlink(missing_ok=True)
+        return None
+    logger.info(
+        "Transcoded %s for upload: %d -> %d bytes",
+        Path(file_path).name, Path(file_path).stat().st_size, out_path.stat().st_size,
+    )
+    return out_path
+
+
+def _read_chunks(file_path: str) -> Iterator[bytes]:
+    """Yield the file in chunks, so uploads never hold the whole recording in memory."""
+    with open(file_path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+
 def transcribe(
     api_key: str,
     file_path: str,
     base_url: str | None = None,
     keyterms: list[str] | None = None,
+    transcode: bool = False,
 ) -> dict:
     """Transcribe an audio file via Deepgram with diarization.
 
     Returns the raw Deepgram response as a dict.
-    Retries on transient failures (429, 5xx) with exponential backoff.
+    Retries on transient failures (429, 5xx, connection errors) with jittered
+    exponential backoff, or after Retry-After when the API sends one.
+    With `transcode`, large files are re-encoded to Opus first if ffmpeg is
+    available.
     """
     client = _create_client(api_key, base_url)
-    audio_data = Path(file_path).read_bytes()
+    transcoded = _transcode_to_opus(file_path) if transcode else None
+    try:
+        return _transcribe_with_retries(client, file_path, str(transcoded or file_path), base_url, keyterms)
+    finally:
+        if transcoded:
+            transcoded.unlink(missing_ok=True)
+
 
+def _transcribe_with_retries(
+    client: DeepgramClient,
+    file_path: str,
+    upload_path: str,
+    base_url: str | None,
+    keyterms: list[str] | None,
+) -> dict:
+    """Upload `upload_path` for transcription; `file_path` is the recording it came from."""
     last_error = None
     for attempt in range(MAX_RETRIES):
         try:
             logger.info("Transcribing %s (attempt %d/%d)", Path(file_path).name, attempt + 1, MAX_RETRIES)
-            # mip_opt_out only relevant for Deepgram hosted API, not self-hosted
+            # A fresh stream per attempt: a failed upload consumes the previous one
             transcribe_kwargs = dict(
-                request=audio_data,
+                request=_read_chunks(upload_path),
                 model="nova-3",
                 diarize=True,
                 smart_format=True,
                 utterances=True,
                 punctuate=True,
+                # The SDK's own retries would resend an already-consumed stream;
+                # this loop retries instead.
+                request_options={"max_retries": 0},
             )
             if keyterms:
                 transcribe_kwargs["keyterm"] = keyterms
+            # mip_opt_out only relevant for Deepgram hosted API, not self-hosted
             if not base_url:
                 transcribe_kwargs["mip_opt_out"] = True
             response = client.listen.v1.media.transcribe_file(**transcribe_kwargs)
@@ -57,10 +158,8 @@ def transcribe(
             return response.model_dump()
         except Exception as e:
             last_error = e
-            error_str = str(e)
-            is_retryable = "429" in error_str or "500" in error_str or "502" in error_str or "503" in error_str
-            if is_retryable and attempt < MAX_RETRIES - 1:
-                backoff = INITIAL_BACKOFF * (2 ** attempt)
+            backoff = _retry_delay(e, attempt)
+            if backoff is not None and attempt < MAX_RETRIES - 1:
                 logger.warning(
                     "Transient error transcribing %s: %s. Retrying in %.1fs...",
                     Path(file_path).name, e, backoff,
@@ -1,58 +1,118 @@
 import logging
 import os
+import threading
 import time
 from collections.abc import Callable
+from concurrent.futures import Executor
 from pathlib import Path
 
-from watchdog.events import FileCreatedEvent, FileSystemEventHandler
+from watchdog.events import FileCreatedEvent, FileModifiedEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
 logger = logging.getLogger(__name__)
 
-# Wait for file size to stabilize before processing
-DEBOUNCE_INTERVAL = 2.0  # seconds between size checks
-DEBOUNCE_CHECKS = 3  # number of consecutive stable checks required
+RECORDING_SUFFIX = ".m4a"
+
+# Treat a recording as finished once it has gone this long without a write
+QUIET_PERIOD = 0.5  # seconds since the last modify event
+POLL_INTERVAL = 0.25  # seconds between idle checks
+# ...and its size has then held for this long, so a pause in recording
+# isn't mistaken for the end
+STABLE_WINDOW = 2.0  # seconds
 
 
 class _RecordingHandler(FileSystemEventHandler):
-    def __init__(self, callback: Callable[[str], None]):
+    def __init__(self, callback: Callable[[str], None], executor: Executor, stable_window: float = STABLE_WINDOW):
         self._callback = callback
+        self._executor = executor
+        self._stable_window = stable_window
+        # Monotonic time of the last create/modify event per recording being written
+        self._last_event: dict[str, float] = {}
+        # Recordings being waited on or processed; FSEvents can report a
+        # creation twice, and the duplicate must not start a second pipeline
+        self._in_flight: set[str] = set()
+        self._lock = threading.Lock()
 
     def on_created(self, event: FileCreatedEvent) -> None:
-        if event.is_directory:
-            return
-        if not event.src_path.endswith(".m4a"):
+        # Cheapest checks first: most events in the directory aren't recordings
+        if not event.src_path.endswith(RECORDING_SUFFIX) or event.is_directory:
             return
-        logger.info("New recording detected: %s", Path(event.src_path).name)
-        self._wait_for_stable(event.src_path)
-        self._callback(event.src_path)
+        with self._lock:
+            if event.src_path in self._in_flight:
+                logger.debug("Duplicate create event ignored: %s", event.src_path)
+                return
+            self._in_flight.add(event.src_path)
+            self._last_event[event.src_path] = time.monotonic()
+        logger.info("New recording detected: %s", event.src_path)
+        # Wait off the observer thread: events are dispatched one at a time,
+        # so blocking here would hold back the modify events we wait on.
+        self._executor.submit(self._handle, event.src_path)
+
+    def on_modified(self, event: FileModifiedEvent) -> None:
+        with self._lock:
+            if event.src_path in self._last_event:
+                self._last_event[event.src_path] = time.monotonic()
+
+    def _handle(self, file_path: str) -> None:
+        try:
+            try:
+                self._wait_for_stable(file_path)
+            finally:
+                with self._lock:
+                    self._last_event.pop(file_path, None)
+            self._callback(file_path)
+        except Exception:
+            # Nothing collects the future, so surface the error here
+            logger.exception("Unhandled error processing %s", file_path)
+        finally:
+            with self._lock:
+                self._in_flight.discard(file_path)
 
     def _wait_for_stable(self, file_path: str) -> None:
-        """Wait until the file size stops changing (recording finished)."""
-        stable_count = 0
+        """Wait until the file stops being written (recording finished).
+
+        Writes arrive as modify events, so this waits for a quiet period with
+        none, then requires the size to hold for the stable window. A write
+        during the window starts the wait over.
+        """
         last_size = -1
-        while stable_count < DEBOUNCE_CHECKS:
+        stable_since = 0.0
+        while True:
+            with self._lock:
+                idle = time.monotonic() - self._last_event[file_path]
+            if idle < QUIET_PERIOD:
+                last_size = -1
+                time.sleep(max(QUIET_PERIOD - idle, POLL_INTERVAL))
+                continue
             try:
                 current_size = os.path.getsize(file_path)
             except OSError:
-                time.sleep(DEBOUNCE_INTERVAL)
-                continue
-            if current_size == last_size:
-                stable_count += 1
-            else:
-                stable_count = 0
-            last_size = current_size
-            time.sleep(DEBOUNCE_INTERVAL)
+                current_size = -1
+            now = time.monotonic()
+            if current_size < 0 or current_size != last_size:
+                last_size = current_size
+                stable_since = now
+            elif now - stable_since >= self._stable_window:
+                break
+            time.sleep(POLL_INTERVAL)
         logger.debug("File stabilized: %s (%d bytes)", Path(file_path).name, last_size)
 
 
-def start_watching(watch_dir: str, callback: Callable[[str], None]) -> Observer:
+def start_watching(
+    watch_dir: str,
+    callback: Callable[[str], None],
+    executor: Executor,
+    stable_window: float = STABLE_WINDOW,
+) -> Observer:
     """Start watching a directory for new .m4a files.
 
     Returns the Observer so the caller can stop it on shutdown.
-    The callback is called with the absolute path of each new stable .m4a file.
+    The callback is called with the absolute path of each new stable .m4a
+    file, on `executor`, so its size bounds how many recordings are
+    processed at once. A recording counts as stable once its size has held
+    for `stable_window` seconds after the last write.
     """
-    handler = _RecordingHandler(callback)
+    handler = _RecordingHandler(callback, executor, stable_window)
     observer = Observer()
     observer.schedule(handler, watch_dir, recursive=False)
     observer.start()
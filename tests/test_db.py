@@ -1,5 +1,8 @@
+import os
+import sqlite3
 from datetime import datetime, timezone
 
+from scribe import db
 from scribe.db import APPLE_EPOCH_OFFSET, _apple_timestamp_to_datetime
 
 
@@ -16,3 +19,131 @@ def test_apple_epoch_offset_value():
     # The offset is the number of seconds between Unix epoch and Apple epoch
     # Unix epoch: Jan 1, 1970. Apple epoch: Jan 1, 2001. Difference: 31 years.
     assert APPLE_EPOCH_OFFSET == 978307200
+
+
+def _make_voice_memos_db(tmp_path, monkeypatch, rows):
+    db_path = tmp_path / "CloudRecordings.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE ZCLOUDRECORDING "
+        "(ZPATH TEXT, ZCUSTOMLABEL TEXT, ZENCRYPTEDTITLE TEXT, ZDATE REAL, ZDURATION REAL)"
+    )
+    conn.executemany("INSERT INTO ZCLOUDRECORDING VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, "CLOUD_RECORDINGS_DB", db_path)
+    db._close()
+    return db_path
+
+
+def test_metadata_lookup_reuses_connection(tmp_path, monkeypatch):
+    _make_voice_memos_db(tmp_path, monkeypatch, [
+        ("20250205 143000-A.m4a", "Standup", None, 760000000.0, 125.0),
+        ("20250205 150000-B.m4a", None, "Lunch", 760001800.0, 60.0),
+    ])
+    first = db.get_recording_metadata("/x/20250205 143000-A.m4a", max_retries=1)
+    conn = db._conn
+    second = db.get_recording_metadata("/x/20250205 150000-B.m4a", max_retries=1)
+    assert first.title == "Standup"
+    assert first.duration_seconds == 125.0
+    assert second.title == "Lunch"
+    assert db._conn is conn
+    db._close()
+
+
+def test_metadata_lookup_sees_rows_added_after_first_load(tmp_path, monkeypatch):
+    db_path = _make_voice_memos_db(tmp_path, monkeypatch, [
+        ("20250205 143000-A.m4a", "Standup", None, 760000000.0, 125.0),
+    ])
+    assert db.get_recording_metadata("/x/20250205 143000-A.m4a", max_retries=1).title == "Standup"
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO ZCLOUDRECORDING VALUES (?, ?, ?, ?, ?)",
+        ("Recordings/20250205 150000-B.m4a", "Retro", None, 760001800.0, 60.0),
+    )
+    conn.commit()
+    conn.close()
+
+    assert db.get_recording_metadata("/x/20250205 150000-B.m4a", max_retries=1).title == "Retro"
+    db._close()
+
+
+def test_metadata_lookup_sees_row_updates(tmp_path, monkeypatch):
+    db_path = _make_voice_memos_db(tmp_path, monkeypatch, [
+        ("Recordings/20250205 143000-A.m4a", None, "New Recording", 760000000.0, 1.0),
+    ])
+    assert db.get_recording_metadata("/x/20250205 143000-A.m4a", max_retries=1).title == "New Recording"
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE ZCLOUDRECORDING SET ZCUSTOMLABEL = 'Standup', ZDURATION = 125.0")
+    conn.commit()
+    conn.close()
+
+    result = db.get_recording_metadata("/x/20250205 143000-A.m4a", max_retries=1)
+    assert (result.title, result.duration_seconds) == ("Standup", 125.0)
+    db._close()
+
+
+def test_metadata_batch_returns_only_found(tmp_path, monkeypatch):
+    _make_voice_memos_db(tmp_path, monkeypatch, [
+        ("20250205 143000-A.m4a", "Standup", None, 760000000.0, 125.0),
+        ("20250205 150000-B.m4a", None, "Lunch", 760001800.0, 60.0),
+    ])
+    result = db.get_recording_metadata_batch([
+        "/x/20250205 143000-A.m4a",
+        "/x/20250205 150000-B.m4a",
+        "/x/missing.m4a",
+    ])
+    assert set(result) == {"/x/20250205 143000-A.m4a", "/x/20250205 150000-B.m4a"}
+    assert result["/x/20250205 150000-B.m4a"].title == "Lunch"
+    assert db._index is None  # the immutable snapshot doesn't replace the live index
+    db._close()
+
+
+def test_unreadable_db_falls_back(tmp_path, monkeypatch):
+    db_path = tmp_path / "CloudRecordings.db"
+    db_path.write_bytes(b"not a database" * 100)
+    monkeypatch.setattr(db, "CLOUD_RECORDINGS_DB", db_path)
+    db._close()
+    audio = tmp_path / "unknown.m4a"
+    audio.write_bytes(b"")
+
+    assert db.get_recording_metadata_batch([str(audio)]) == {}
+    assert db.get_recording_metadata(str(audio), max_retries=1).duration_seconds == 0.0
+    db._close()
+
+
+def test_metadata_batch_skips_bad_rows(tmp_path, monkeypatch):
+    _make_voice_memos_db(tmp_path, monkeypatch, [
+        ("20250205 143000-A.m4a", "Standup", None, 760000000.0, 125.0),
+        ("20250205 150000-B.m4a", "Broken", None, None, 60.0),
+    ])
+    result = db.get_recording_metadata_batch(["/x/20250205 143000-A.m4a", "/x/20250205 150000-B.m4a"])
+    assert set(result) == {"/x/20250205 143000-A.m4a"}
+    db._close()
+
+
+def test_fallback_metadata_uses_file_mtime(tmp_path, monkeypatch):
+    _make_voice_memos_db(tmp_path, monkeypatch, [])
+    audio = tmp_path / "unknown.m4a"
+    audio.write_bytes(b"")
+    mtime = datetime(2025, 2, 5, 14, 30, tzinfo=timezone.utc).timestamp()
+    os.utime(audio, (mtime, mtime))
+
+    result = db.get_recording_metadata(str(audio), max_retries=1)
+    assert result.title == "Voice Memo - Feb 5, 2025 2:30 PM"
+    assert result.date.timestamp() == mtime
+    assert result.duration_seconds == 0.0
+    db._close()
+
+
+def test_metadata_display_strings_are_cached():
+    meta = db.RecordingMetadata(
+        title="Memo", date=datetime(2025, 2, 5, 14, 30, tzinfo=timezone.utc), duration_seconds=3661.0,
+    )
+    assert "date_str" not in vars(meta)
+    assert meta.date_str == "Feb 5, 2025"
+    assert meta.duration_str == "1:01:01"
+    assert vars(meta)["duration_str"] == "1:01:01"
+    assert meta == db.RecordingMetadata(title="Memo", date=meta.date, duration_seconds=3661.0)
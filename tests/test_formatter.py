@@ -1,7 +1,16 @@
+import functools
 from datetime import datetime, timezone
 
+import pytest
+
 from scribe.db import RecordingMetadata
-from scribe.formatter import format_transcript, format_transcript_markdown
+from scribe.formatter import (
+    format_transcript,
+    format_transcript_markdown,
+    prepare_transcript,
+    render_html,
+    render_markdown,
+)
 from scribe.summarizer import Summary
 
 
@@ -13,31 +22,32 @@ def _make_metadata(title="Test Recording", duration=125.0):
     )
 
 
-def _make_response(utterances, num_channels=1):
-    """Build a minimal Deepgram-like response dict."""
-    return {
-        "results": {
-            "channels": [
-                {
-                    "alternatives": [
-                        {
-                            "transcript": " ".join(
-                                u["transcript"] for u in utterances
-                            )
-                        }
-                    ]
-                }
-            ],
-            "utterances": utterances,
+@pytest.fixture(scope="session")
+def response_factory():
+    """Build minimal Deepgram-like response dicts from (speaker, transcript) pairs.
+
+    Memoized, so tests using the same utterances share one response; the
+    formatter never mutates it.
+    """
+    @functools.lru_cache(maxsize=None)
+    def make(*utterances: tuple[int, str]) -> dict:
+        return {
+            "results": {
+                "channels": [
+                    {"alternatives": [{"transcript": " ".join(text for _, text in utterances)}]}
+                ],
+                "utterances": [{"speaker": speaker, "transcript": text} for speaker, text in utterances],
+            }
         }
-    }
+
+    return make
 
 
-def test_single_speaker_format():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello this is a test."},
-        {"speaker": 0, "transcript": "Another sentence here."},
-    ])
+def test_single_speaker_format(response_factory):
+    response = response_factory(
+        (0, "Hello this is a test."),
+        (0, "Another sentence here."),
+    )
     html = format_transcript(response, _make_metadata())
     assert "<h1>Test Recording - Feb 5, 2025</h1>" in html
     assert "Duration: 2:05" in html
@@ -46,12 +56,12 @@ def test_single_speaker_format():
     assert "Another sentence here." in html
 
 
-def test_multi_speaker_format():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Good morning."},
-        {"speaker": 1, "transcript": "Hi there."},
-        {"speaker": 0, "transcript": "Shall we begin?"},
-    ])
+def test_multi_speaker_format(response_factory):
+    response = response_factory(
+        (0, "Good morning."),
+        (1, "Hi there."),
+        (0, "Shall we begin?"),
+    )
     html = format_transcript(response, _make_metadata())
     assert "Speakers: 2" in html
     assert "<b>Speaker 1:</b> Good morning." in html
@@ -70,9 +80,9 @@ def test_plain_text_fallback():
     assert "Just plain text here." in html
 
 
-def test_duration_formatting():
+def test_duration_formatting(response_factory):
     meta_short = _make_metadata(duration=65.0)
-    response = _make_response([{"speaker": 0, "transcript": "Test."}])
+    response = response_factory((0, "Test."))
     html = format_transcript(response, meta_short)
     assert "Duration: 1:05" in html
 
@@ -97,11 +107,11 @@ def test_empty_utterances_use_transcript():
 # Markdown format tests
 
 
-def test_single_speaker_markdown():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello this is a test."},
-        {"speaker": 0, "transcript": "Another sentence here."},
-    ])
+def test_single_speaker_markdown(response_factory):
+    response = response_factory(
+        (0, "Hello this is a test."),
+        (0, "Another sentence here."),
+    )
     md = format_transcript_markdown(response, _make_metadata())
     assert "# Test Recording - Feb 5, 2025" in md
     assert "*Duration: 2:05*" in md
@@ -109,11 +119,11 @@ def test_single_speaker_markdown():
     assert "Hello this is a test." in md
 
 
-def test_multi_speaker_markdown():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Good morning."},
-        {"speaker": 1, "transcript": "Hi there."},
-    ])
+def test_multi_speaker_markdown(response_factory):
+    response = response_factory(
+        (0, "Good morning."),
+        (1, "Hi there."),
+    )
     md = format_transcript_markdown(response, _make_metadata())
     assert "Speakers: 2" in md
     assert "**Speaker 1:** Good morning." in md
@@ -142,10 +152,10 @@ def _make_summary(
     )
 
 
-def test_html_with_summary_and_title():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello this is a test."},
-    ])
+def test_html_with_summary_and_title(response_factory):
+    response = response_factory(
+        (0, "Hello this is a test."),
+    )
     s = _make_summary()
     html = format_transcript(
         response, _make_metadata(),
@@ -160,10 +170,10 @@ def test_html_with_summary_and_title():
     assert "Test Recording" not in html  # original title replaced
 
 
-def test_html_renders_all_summary_sections():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello."},
-    ])
+def test_html_renders_all_summary_sections(response_factory):
+    response = response_factory(
+        (0, "Hello."),
+    )
     s = _make_summary(
         key_points=["point 1"],
         action_items=["action 1"],
@@ -181,10 +191,10 @@ def test_html_renders_all_summary_sections():
     assert "<li>question 1</li>" in html
 
 
-def test_html_omits_empty_summary_sections():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello."},
-    ])
+def test_html_omits_empty_summary_sections(response_factory):
+    response = response_factory(
+        (0, "Hello."),
+    )
     s = _make_summary(key_points=["only key points"], action_items=[], decisions=[], open_questions=[])
     html = format_transcript(response, _make_metadata(), title=s.title, summary=s)
     assert "<h2>Key Points</h2>" in html
@@ -193,10 +203,10 @@ def test_html_omits_empty_summary_sections():
     assert "Open Questions" not in html
 
 
-def test_markdown_with_summary_and_title():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello this is a test."},
-    ])
+def test_markdown_with_summary_and_title(response_factory):
+    response = response_factory(
+        (0, "Hello this is a test."),
+    )
     s = _make_summary()
     md = format_transcript_markdown(
         response, _make_metadata(),
@@ -211,10 +221,10 @@ def test_markdown_with_summary_and_title():
     assert "Test Recording" not in md
 
 
-def test_markdown_renders_all_summary_sections():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello."},
-    ])
+def test_markdown_renders_all_summary_sections(response_factory):
+    response = response_factory(
+        (0, "Hello."),
+    )
     s = _make_summary(
         key_points=["point 1"],
         action_items=["action 1"],
@@ -232,20 +242,20 @@ def test_markdown_renders_all_summary_sections():
     assert "- question 1" in md
 
 
-def test_html_without_summary_unchanged():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Hello."},
-    ])
+def test_html_without_summary_unchanged(response_factory):
+    response = response_factory(
+        (0, "Hello."),
+    )
     html_no_summary = format_transcript(response, _make_metadata())
     html_none = format_transcript(response, _make_metadata(), title=None, summary=None)
     assert html_no_summary == html_none
 
 
-def test_multi_speaker_html_with_summary():
-    response = _make_response([
-        {"speaker": 0, "transcript": "Good morning."},
-        {"speaker": 1, "transcript": "Hi there."},
-    ])
+def test_multi_speaker_html_with_summary(response_factory):
+    response = response_factory(
+        (0, "Good morning."),
+        (1, "Hi there."),
+    )
     s = _make_summary(title="Team Standup", summary_text="Discussed sprint progress.")
     html = format_transcript(
         response, _make_metadata(),
@@ -255,3 +265,43 @@ def test_multi_speaker_html_with_summary():
     assert "<h1>Team Standup - Feb 5, 2025</h1>" in html
     assert "Discussed sprint progress." in html
     assert "Speakers: 2" in html
+
+
+def test_prepared_transcript_renders_both_formats(response_factory):
+    response = response_factory(
+        (0, "Good morning."),
+        (1, "Hi there."),
+    )
+    s = _make_summary()
+    prepared = prepare_transcript(response, _make_metadata(), title=s.title, summary=s)
+    assert prepared.num_speakers == 2
+    assert render_html(prepared) == format_transcript(response, _make_metadata(), title=s.title, summary=s)
+    assert render_markdown(prepared) == format_transcript_markdown(
+        response, _make_metadata(), title=s.title, summary=s
+    )
+
+
+def test_multi_speaker_merges_consecutive_turns(response_factory):
+    response = response_factory(
+        (0, "Good morning."),
+        (0, "Shall we begin?"),
+        (1, ""),
+        (1, "Sure."),
+        (0, "Great."),
+    )
+    html = format_transcript(response, _make_metadata())
+    assert "<b>Speaker 1:</b> Good morning. Shall we begin?</p>" in html
+    assert html.count("<b>Speaker") == 3
+    md = format_transcript_markdown(response, _make_metadata())
+    assert "**Speaker 2:** Sure.\n\n**Speaker 1:** Great." in md
+
+
+def test_html_escapes_transcript_and_summary(response_factory):
+    response = response_factory((0, "if a < b && c > d"))
+    s = _make_summary(title="R&D <sync>", key_points=["use <b> tags"])
+    html = format_transcript(response, _make_metadata(), title=s.title, summary=s)
+    assert "<h1>R&amp;D &lt;sync&gt; - Feb 5, 2025</h1>" in html
+    assert "<p>if a &lt; b &amp;&amp; c &gt; d</p>" in html
+    assert "<li>use &lt;b&gt; tags</li>" in html
+    md = format_transcript_markdown(response, _make_metadata(), title=s.title, summary=s)
+    assert "if a < b && c > d" in md
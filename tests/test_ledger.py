@@ -1,36 +1,60 @@
+import os
+import sqlite3
+import threading
 import tempfile
 from pathlib import Path
 
-from scribe.ledger import Ledger
+import pytest
 
+from scribe import ledger as ledger_module
+from scribe.ledger import IN_MEMORY, Ledger
 
-def _make_ledger(tmp_path: Path) -> Ledger:
+# Set SCRIBE_TEST_INMEM=1 to run tests that don't inspect the DB file against :memory:
+_IN_MEMORY = bool(os.getenv("SCRIBE_TEST_INMEM"))
+
+
+@pytest.fixture(scope="module")
+def _shared_ledger(tmp_path_factory):
+    """One ledger for the module, so the DB file and schema are created once."""
+    shared = Ledger(db_path=IN_MEMORY if _IN_MEMORY else tmp_path_factory.mktemp("ledger") / "test.db")
+    yield shared
+    shared.close()
+
+
+@pytest.fixture
+def ledger(_shared_ledger):
+    """The shared ledger, emptied after each test."""
+    yield _shared_ledger
+    _shared_ledger.flush()
+    with _shared_ledger._lock:
+        _shared_ledger._conn.execute("DELETE FROM processed")
+        _shared_ledger._conn.commit()
+
+
+def _make_file_ledger(tmp_path: Path) -> Ledger:
+    """For tests of on-disk behaviour (permissions, WAL, persistence)."""
     return Ledger(db_path=tmp_path / "test.db")
 
 
-def test_new_file_is_not_known(tmp_path):
-    ledger = _make_ledger(tmp_path)
+def test_new_file_is_not_known(ledger):
     assert not ledger.is_known("/fake/file.m4a")
     assert not ledger.is_processed("/fake/file.m4a")
 
 
-def test_mark_pending_makes_known(tmp_path):
-    ledger = _make_ledger(tmp_path)
+def test_mark_pending_makes_known(ledger):
     ledger.mark_pending("/fake/file.m4a")
     assert ledger.is_known("/fake/file.m4a")
     assert not ledger.is_processed("/fake/file.m4a")
 
 
-def test_mark_done(tmp_path):
-    ledger = _make_ledger(tmp_path)
+def test_mark_done(ledger):
     ledger.mark_pending("/fake/file.m4a")
     ledger.mark_processing("/fake/file.m4a")
     ledger.mark_done("/fake/file.m4a")
     assert ledger.is_processed("/fake/file.m4a")
 
 
-def test_mark_failed_and_retry(tmp_path):
-    ledger = _make_ledger(tmp_path)
+def test_mark_failed_and_retry(ledger):
     ledger.mark_pending("/fake/file.m4a")
     ledger.mark_processing("/fake/file.m4a")
     ledger.mark_failed("/fake/file.m4a", "some error")
@@ -43,15 +67,13 @@ def test_mark_failed_and_retry(tmp_path):
     assert ledger.get_pending() == ["/fake/file.m4a"]
 
 
-def test_duplicate_pending_is_ignored(tmp_path):
-    ledger = _make_ledger(tmp_path)
+def test_duplicate_pending_is_ignored(ledger):
     ledger.mark_pending("/fake/file.m4a")
     ledger.mark_pending("/fake/file.m4a")  # should not raise
     assert ledger.get_pending() == ["/fake/file.m4a"]
 
 
-def test_get_pending_returns_multiple(tmp_path):
-    ledger = _make_ledger(tmp_path)
+def test_get_pending_returns_multiple(ledger):
     ledger.mark_pending("/fake/a.m4a")
     ledger.mark_pending("/fake/b.m4a")
     pending = ledger.get_pending()
@@ -59,7 +81,127 @@ def test_get_pending_returns_multiple(tmp_path):
 
 
 def test_db_permissions(tmp_path):
-    ledger = _make_ledger(tmp_path)
+    ledger = _make_file_ledger(tmp_path)
     db_path = tmp_path / "test.db"
     mode = db_path.stat().st_mode & 0o777
     assert mode == 0o600
+
+
+def test_uses_wal_journal(tmp_path):
+    ledger = _make_file_ledger(tmp_path)
+    mode = ledger._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_wal_files_inherit_permissions(tmp_path):
+    ledger = _make_file_ledger(tmp_path)
+    ledger.mark_pending("/fake/file.m4a")
+    wal_path = tmp_path / "test.db-wal"
+    assert wal_path.stat().st_mode & 0o777 == 0o600
+
+
+def test_transaction_groups_writes(ledger):
+    with ledger.transaction():
+        ledger.mark_pending("/fake/a.m4a")
+        ledger.mark_pending("/fake/b.m4a")
+        assert not ledger.is_known("/fake/a.m4a")  # queued only on exit
+    assert set(ledger.get_pending()) == {"/fake/a.m4a", "/fake/b.m4a"}
+
+
+def test_transaction_rolls_back_on_error(ledger):
+    with pytest.raises(RuntimeError):
+        with ledger.transaction():
+            ledger.mark_pending("/fake/a.m4a")
+            raise RuntimeError("boom")
+    assert not ledger.is_known("/fake/a.m4a")
+
+
+def test_get_status(ledger):
+    assert ledger.get_status("/fake/file.m4a") is None
+    ledger.mark_pending("/fake/file.m4a")
+    assert ledger.get_status("/fake/file.m4a") == "pending"
+    ledger.mark_done("/fake/file.m4a")
+    assert ledger.get_status("/fake/file.m4a") == "done"
+
+
+def test_mark_pending_many(ledger):
+    ledger.mark_pending("/fake/a.m4a")
+    ledger.mark_done("/fake/a.m4a")
+    ledger.mark_pending_many(["/fake/a.m4a", "/fake/b.m4a", "/fake/c.m4a"])
+    assert ledger.is_processed("/fake/a.m4a")  # existing rows are left alone
+    assert set(ledger.get_pending()) == {"/fake/b.m4a", "/fake/c.m4a"}
+    assert ledger.get_known() == {"/fake/a.m4a", "/fake/b.m4a", "/fake/c.m4a"}
+
+
+def test_mark_pending_many_accepts_generator(ledger):
+    ledger.mark_pending_many(f"/fake/{name}.m4a" for name in ("a", "b", "a"))
+    assert set(ledger.get_pending()) == {"/fake/a.m4a", "/fake/b.m4a"}
+
+
+def test_requeue_only_resets_processing(ledger):
+    ledger.mark_pending_many(["/fake/a.m4a", "/fake/b.m4a", "/fake/c.m4a"])
+    ledger.mark_processing("/fake/a.m4a")
+    ledger.mark_processing("/fake/b.m4a")
+    ledger.mark_done("/fake/b.m4a")
+    ledger.requeue(["/fake/a.m4a", "/fake/b.m4a", "/fake/c.m4a"])
+    assert set(ledger.get_pending()) == {"/fake/a.m4a", "/fake/c.m4a"}
+    assert ledger.is_processed("/fake/b.m4a")
+
+
+def test_close_commits_queued_writes(tmp_path):
+    ledger = _make_file_ledger(tmp_path)
+    ledger.mark_pending("/fake/file.m4a")
+    ledger.mark_done("/fake/file.m4a")
+    ledger.close()
+
+    reopened = _make_file_ledger(tmp_path)
+    assert reopened.is_processed("/fake/file.m4a")
+
+
+def test_status_lookups_use_index(ledger):
+    plan = ledger._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT file_path FROM processed WHERE status = 'pending'"
+    ).fetchall()
+    assert any("idx_processed_status" in row[3] for row in plan)
+
+
+def test_in_memory_ledger():
+    ledger = Ledger(db_path=IN_MEMORY)
+    ledger.mark_pending_many(["/fake/a.m4a", "/fake/b.m4a"])
+    ledger.mark_done("/fake/a.m4a")
+    assert ledger.get_pending() == ["/fake/b.m4a"]
+    ledger.close()
+
+
+def test_accepts_str_path(tmp_path):
+    ledger = Ledger(db_path=str(tmp_path / "test.db"))
+    ledger.mark_pending("/fake/file.m4a")
+    assert ledger.is_known("/fake/file.m4a")
+    ledger.close()
+    assert (tmp_path / "test.db").exists()
+
+
+def test_failed_write_group_keeps_other_groups(ledger):
+    ledger.mark_pending("/fake/a.m4a")
+    ledger.flush()
+    # Queue a bad group and a good one so the writer applies them together
+    with ledger._lock:
+        ledger._write("INSERT INTO missing_table VALUES (?)", [(1,)])
+        ledger.mark_done("/fake/a.m4a")
+    assert ledger.is_processed("/fake/a.m4a")
+
+
+def test_commit_retries_while_db_is_locked(tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger_module, "_BUSY_BACKOFF", 0.05)
+    ledger = _make_file_ledger(tmp_path)
+    ledger._conn.execute("PRAGMA busy_timeout=20")
+    other = sqlite3.connect(tmp_path / "test.db", isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")  # e.g. a concurrent --backfill holding the write lock
+    ledger.mark_pending("/fake/file.m4a")
+    release = threading.Timer(0.2, other.execute, args=("COMMIT",))
+    release.start()
+
+    assert ledger.is_known("/fake/file.m4a")
+    release.join()
+    other.close()
+    ledger.close()
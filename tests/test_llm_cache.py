@@ -0,0 +1,36 @@
+from scribe.llm_cache import SqliteCache, cache_key
+
+
+def _request(prompt: str = "Summarize this", max_tokens: int = 1500) -> dict:
+    return {
+        "model": "gpt-4.1",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+    }
+
+
+def test_key_covers_all_parameters():
+    assert cache_key(_request()) == cache_key(_request())
+    assert cache_key(_request()) != cache_key(_request(prompt="Summarize that"))
+    assert cache_key(_request()) != cache_key(_request(max_tokens=2500))
+
+
+def test_round_trip_persists(tmp_path):
+    db_path = tmp_path / "llm_cache.db"
+    cache = SqliteCache(db_path)
+    key = cache_key(_request())
+    assert cache.get(key) is None
+    cache.put(key, '{"title": "T"}')
+    cache.close()
+
+    reopened = SqliteCache(db_path)
+    assert reopened.get(key) == '{"title": "T"}'
+    assert (reopened.hits, reopened.misses) == (1, 0)
+    reopened.close()
+
+
+def test_cache_file_permissions(tmp_path):
+    db_path = tmp_path / "llm_cache.db"
+    SqliteCache(db_path).close()
+    assert db_path.stat().st_mode & 0o777 == 0o600
@@ -0,0 +1,126 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from scribe.db import RecordingMetadata
+from scribe.ledger import IN_MEMORY, Ledger
+from scribe.main import Config, _process_with_batch_summaries, _summary_input
+from scribe.summarizer import Summary
+
+PATHS = ["/fake/a.m4a", "/fake/b.m4a"]
+
+
+def _response(utterances=None, transcript=""):
+    return {
+        "results": {
+            "utterances": utterances,
+            "channels": [{"alternatives": [{"transcript": transcript}]}],
+        }
+    }
+
+
+@pytest.fixture
+def ledger():
+    ledger = Ledger(db_path=IN_MEMORY)
+    ledger.mark_pending_many(PATHS)
+    yield ledger
+    ledger.close()
+
+
+@pytest.fixture
+def cfg():
+    return Config(
+        api_key="dg-key",
+        notes_folder="Scribe",
+        notes_account="iCloud",
+        output_dir=None,
+        deepgram_base_url=None,
+        openai_api_key="oa-key",
+        keyterms=[],
+        backfill_concurrency=2,
+        watch_concurrency=1,
+        watch_stable_seconds=2.0,
+        batch_summaries=True,
+        transcode_audio=False,
+    )
+
+
+@pytest.fixture
+def prefetched():
+    return {fp: RecordingMetadata(title="Memo", date=datetime(2024, 3, 5), duration_seconds=60.0) for fp in PATHS}
+
+
+def test_summary_input_merges_speaker_turns():
+    response = _response([
+        {"speaker": 0, "transcript": "Hello."},
+        {"speaker": 0, "transcript": "Still me."},
+        {"speaker": 1, "transcript": " "},
+        {"speaker": 1, "transcript": "Hi."},
+    ])
+    assert _summary_input(response) == ("Speaker 1: Hello. Still me. Speaker 2: Hi.", 2)
+
+
+def test_summary_input_single_speaker_uses_channel_transcript():
+    response = _response([{"speaker": 0, "transcript": "One."}, {"speaker": 0, "transcript": "Two."}], "One. Two!")
+    assert _summary_input(response) == ("One. Two!", 1)
+
+
+def test_summary_input_single_speaker_joins_utterances_without_channel_text():
+    response = _response([{"speaker": 0, "transcript": " One. "}, {"speaker": 0, "transcript": ""}, {"speaker": 0, "transcript": "Two."}])
+    assert _summary_input(response) == ("One. Two.", 1)
+
+
+def test_summary_input_without_utterances():
+    assert _summary_input(_response(transcript="Plain text.")) == ("Plain text.", 1)
+
+
+def _run_batch(ledger, cfg, prefetched, summarize_batch, summarize_many):
+    response = _response([{"speaker": 0, "transcript": "Some words."}])
+    published = {}
+
+    def publish(fp, ledger, cfg, metadata, response, summary):
+        published[fp] = summary
+        ledger.mark_done(fp)
+
+    with patch("scribe.main.transcribe", return_value=response), \
+         patch("scribe.main.summarize_batch", side_effect=summarize_batch), \
+         patch("scribe.main.summarize_many", side_effect=summarize_many) as many, \
+         patch("scribe.main._publish_recording", side_effect=publish):
+        _process_with_batch_summaries(PATHS, ledger, cfg, prefetched)
+    return published, many
+
+
+def test_batch_falls_back_to_summarize_many_for_missing(ledger, cfg, prefetched):
+    from_batch = Summary(title="From batch", summary="S")
+    from_many = Summary(title="From many", summary="S")
+    published, many = _run_batch(
+        ledger, cfg, prefetched,
+        summarize_batch=lambda jobs, *args, **kwargs: {PATHS[0]: from_batch},
+        summarize_many=lambda jobs, *args, **kwargs: {job.custom_id: from_many for job in jobs},
+    )
+    assert [job.custom_id for job in many.call_args.args[0]] == [PATHS[1]]
+    assert published == {PATHS[0]: from_batch, PATHS[1]: from_many}
+    assert all(ledger.is_processed(fp) for fp in PATHS)
+
+
+def test_failed_batch_summarizes_everything_individually(ledger, cfg, prefetched):
+    def failing_batch(*args, **kwargs):
+        raise RuntimeError("batch expired")
+
+    published, many = _run_batch(
+        ledger, cfg, prefetched,
+        summarize_batch=failing_batch,
+        summarize_many=lambda jobs, *args, **kwargs: {},
+    )
+    assert [job.custom_id for job in many.call_args.args[0]] == PATHS
+    assert published == {PATHS[0]: None, PATHS[1]: None}
+
+
+def test_interrupted_batch_requeues_transcribed_recordings(ledger, cfg, prefetched):
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        _run_batch(ledger, cfg, prefetched, summarize_batch=interrupted, summarize_many=None)
+    assert sorted(ledger.get_pending()) == PATHS
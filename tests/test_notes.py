@@ -1,3 +1,9 @@
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from scribe import notes
 from scribe.notes import _escape_applescript
 
 
@@ -15,3 +21,82 @@ def test_escape_applescript_plain():
 
 def test_escape_applescript_mixed():
     assert _escape_applescript('a "b" c\\d') == 'a \\"b\\" c\\\\d'
+
+
+def test_ensure_folder_checks_once_per_folder():
+    notes._known_folders.clear()
+    with patch("scribe.notes.subprocess.run") as run:
+        run.return_value = MagicMock(returncode=0)
+        notes._ensure_folder("Scribe", "iCloud")
+        notes._ensure_folder("Scribe", "iCloud")
+        notes._ensure_folder("Other", "iCloud")
+    assert run.call_count == 2
+    notes._known_folders.clear()
+
+
+def test_ensure_folder_retries_after_failure():
+    notes._known_folders.clear()
+    with patch("scribe.notes.subprocess.run") as run:
+        run.return_value = MagicMock(returncode=1)
+        notes._ensure_folder("Scribe", "iCloud")
+        notes._ensure_folder("Scribe", "iCloud")
+    assert run.call_count == 2
+    notes._known_folders.clear()
+
+
+def test_ensure_folder_runs_once_under_concurrency():
+    notes._known_folders.clear()
+
+    def slow_run(*args, **kwargs):
+        time.sleep(0.05)
+        return MagicMock(returncode=0)
+
+    with patch("scribe.notes.subprocess.run", side_effect=slow_run) as run:
+        threads = [threading.Thread(target=notes._ensure_folder, args=("Scribe", "iCloud")) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert run.call_count == 1
+    notes._known_folders.clear()
+
+
+def test_create_note_passes_values_as_arguments(tmp_path, monkeypatch):
+    """The script is compiled once; title/folder/account go in argv, not the script source."""
+    monkeypatch.setattr(notes, "COMPILED_SCRIPT_DIR", tmp_path)
+    monkeypatch.setattr(notes, "_create_note_script", None)
+    notes._known_folders.add(("Scribe", "iCloud"))
+    with patch("scribe.notes.subprocess.run") as run:
+        run.return_value = MagicMock(returncode=0)
+        assert notes.create_note('Say "hi"', "<p>body</p>")
+        assert notes.create_note("Second", "<p>body</p>")
+
+    compile_calls = [c for c in run.call_args_list if c.args[0][0] == "/usr/bin/osacompile"]
+    note_calls = [c for c in run.call_args_list if c.args[0][0] == "/usr/bin/osascript"]
+    assert len(compile_calls) == 1
+    assert len(note_calls) == 2
+    argv = note_calls[0].args[0]
+    assert argv[1] == str(tmp_path / "create_note.scpt")
+    assert argv[2:] == ['Say "hi"', "Scribe", "iCloud", "html", "<p>body</p>"]
+    notes._known_folders.clear()
+
+
+def test_create_note_large_body_uses_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(notes, "_create_note_script", tmp_path / "create_note.scpt")
+    monkeypatch.setattr(notes, "INLINE_BODY_MAX_CHARS", 10)
+    notes._known_folders.add(("Scribe", "iCloud"))
+    body = "<p>" + "x" * 20 + "</p>"
+    seen = {}
+
+    def run(argv, **kwargs):
+        seen["argv"] = argv
+        seen["body"] = Path(argv[6]).read_text()
+        return MagicMock(returncode=0)
+
+    with patch("scribe.notes.subprocess.run", side_effect=run):
+        assert notes.create_note("Long", body)
+
+    assert seen["argv"][5] == "file"
+    assert seen["body"] == body
+    assert not Path(seen["argv"][6]).exists()
+    notes._known_folders.clear()
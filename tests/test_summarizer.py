@@ -1,20 +1,29 @@
+import asyncio
 import json
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from scribe.summarizer import Summary, summarize
+from scribe.llm_cache import SqliteCache
+from scribe.summarizer import Summary, SummarizeJob, _client, summarize, summarize_batch, summarize_many
 
 
-def _mock_openai_response(content: str) -> MagicMock:
-    """Build a mock OpenAI chat completion response."""
-    message = MagicMock()
-    message.content = content
-    choice = MagicMock()
-    choice.message = message
-    response = MagicMock()
-    response.choices = [choice]
-    return response
+@pytest.fixture(autouse=True)
+def _fresh_client():
+    """Each test patches OpenAI, so don't let a cached client leak between tests."""
+    _client.cache_clear()
+    yield
+    _client.cache_clear()
+
+
+def _mock_openai_response(content: str) -> SimpleNamespace:
+    """Build a stand-in OpenAI chat completion response.
+
+    summarize only reads .choices[0].message.content, so plain namespaces
+    suffice and are much cheaper to build than MagicMocks.
+    """
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
 
 
 class TestSummarize:
@@ -44,6 +53,8 @@ class TestSummarize:
             prompt = call_args.kwargs["messages"][0]["content"]
             assert "voice note" in prompt
             assert "Speakers: 1" in prompt
+            assert call_args.kwargs["response_format"] == {"type": "json_object"}
+            assert "JSON" in prompt
 
     def test_multi_speaker_prompt(self):
         """Multi speaker should use 'meeting transcript' context and per-person instruction."""
@@ -103,6 +114,19 @@ class TestSummarize:
                 key_points=[], action_items=[], decisions=[], open_questions=[],
             )
 
+    def test_handles_prose_around_json(self):
+        """Text before or after the JSON object (or an unclosed fence) is ignored."""
+        content = 'Here is the summary:\n```json\n{"title": "My Note", "summary": "A {braced} summary."}\nHope this helps!'
+        mock_response = _mock_openai_response(content)
+
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            client = MockClient.return_value
+            client.chat.completions.create.return_value = mock_response
+
+            result = summarize("Some text", 60.0, 1, "fake-key")
+            assert result.title == "My Note"
+            assert result.summary == "A {braced} summary."
+
     def test_api_error_propagates(self):
         """API errors should propagate so caller can handle fallback."""
         with patch("scribe.summarizer.OpenAI") as MockClient:
@@ -112,6 +136,21 @@ class TestSummarize:
             with pytest.raises(Exception, match="API Error"):
                 summarize("Some text", 60.0, 1, "fake-key")
 
+    def test_client_reused_across_calls(self):
+        """The OpenAI client should be built once per API key."""
+        expected = {"title": "Note", "summary": "Summary."}
+        mock_response = _mock_openai_response(json.dumps(expected))
+
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            client = MockClient.return_value
+            client.chat.completions.create.return_value = mock_response
+
+            summarize("Some text", 60.0, 1, "fake-key")
+            summarize("Other text", 60.0, 1, "fake-key")
+
+            assert MockClient.call_count == 1
+            assert client.chat.completions.create.call_count == 2
+
     def test_uses_gpt4o_model(self):
         """Should call GPT-4o specifically."""
         expected = {"title": "Note", "summary": "Summary."}
@@ -220,3 +259,134 @@ class TestSummarize:
             call_args = client.chat.completions.create.call_args
             prompt = call_args.kwargs["messages"][0]["content"]
             assert "MUST capture every person" not in prompt
+
+    def test_cache_skips_repeat_request(self, tmp_path):
+        """An identical request is answered from the cache; a different one isn't."""
+        cache = SqliteCache(tmp_path / "llm_cache.db")
+        mock_response = _mock_openai_response(json.dumps({"title": "Note", "summary": "Summary."}))
+
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            client = MockClient.return_value
+            client.chat.completions.create.return_value = mock_response
+
+            first = summarize("Some text", 60.0, 1, "fake-key", cache=cache)
+            second = summarize("Some text", 60.0, 1, "fake-key", cache=cache)
+            summarize("Other text", 60.0, 1, "fake-key", cache=cache)
+
+            assert first == second
+            assert client.chat.completions.create.call_count == 2
+            assert (cache.hits, cache.misses) == (1, 2)
+        cache.close()
+
+
+class TestSummarizeBatch:
+    def test_submits_jsonl_and_parses_results(self):
+        jobs = [
+            SummarizeJob("a.m4a", "Hello", 60.0, 1),
+            SummarizeJob("b.m4a", "Speaker 1: Hi", 600.0, 2, keyterms=["Appian"]),
+        ]
+        output = "\n".join([
+            json.dumps({"custom_id": "a.m4a", "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": json.dumps({"title": "A", "summary": "Sa"})}}],
+            }}}),
+            json.dumps({"custom_id": "b.m4a", "response": {"status_code": 500, "body": {}}}),
+        ])
+
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            client = MockClient.return_value
+            client.batches.create.return_value = MagicMock(id="batch_1", status="in_progress")
+            client.batches.retrieve.return_value = MagicMock(
+                id="batch_1", status="completed", output_file_id="file_out",
+            )
+            client.files.content.return_value = MagicMock(text=output)
+
+            result = summarize_batch(jobs, "fake-key", poll_interval=0)
+
+            assert result == {"a.m4a": Summary(
+                title="A", summary="Sa", key_points=[], action_items=[], decisions=[], open_questions=[],
+            )}
+            _, payload = client.files.create.call_args.kwargs["file"]
+            requests = [json.loads(line) for line in payload.decode().splitlines()]
+            assert [r["custom_id"] for r in requests] == ["a.m4a", "b.m4a"]
+            assert requests[1]["body"]["max_tokens"] == 2500
+            assert "Appian" in requests[1]["body"]["messages"][0]["content"]
+            assert client.batches.create.call_args.kwargs["completion_window"] == "24h"
+
+    def test_failed_batch_returns_empty(self):
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            client = MockClient.return_value
+            client.batches.create.return_value = MagicMock(id="batch_1", status="failed", output_file_id=None)
+
+            assert summarize_batch([SummarizeJob("a.m4a", "Hello", 60.0, 1)], "fake-key") == {}
+
+    def test_no_jobs_skips_api(self):
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            assert summarize_batch([], "fake-key") == {}
+            MockClient.assert_not_called()
+
+    def test_cached_jobs_not_submitted(self, tmp_path):
+        cache = SqliteCache(tmp_path / "llm_cache.db")
+        mock_response = _mock_openai_response(json.dumps({"title": "A", "summary": "Sa"}))
+
+        with patch("scribe.summarizer.OpenAI") as MockClient:
+            client = MockClient.return_value
+            client.chat.completions.create.return_value = mock_response
+            summarize("Hello", 60.0, 1, "fake-key", cache=cache)
+
+            result = summarize_batch([SummarizeJob("a.m4a", "Hello", 60.0, 1)], "fake-key", cache=cache)
+
+            assert result["a.m4a"].title == "A"
+            client.files.create.assert_not_called()
+        cache.close()
+
+
+def test_client_uses_http2_when_available(monkeypatch):
+    monkeypatch.setattr("scribe.summarizer._HTTP2_AVAILABLE", True)
+    with (
+        patch("scribe.summarizer.OpenAI") as MockClient,
+        patch("scribe.summarizer.DefaultHttpxClient") as MockHttpx,
+    ):
+        _client("fake-key")
+    MockHttpx.assert_called_once_with(http2=True)
+    assert MockClient.call_args.kwargs["http_client"] is MockHttpx.return_value
+
+
+def test_summary_lists_default_empty_and_fields_are_frozen():
+    summary = Summary(title="T", summary="S")
+    assert summary.key_points == [] and summary.open_questions == []
+    with pytest.raises(AttributeError):
+        summary.title = "Other"
+
+
+class TestSummarizeMany:
+    def test_runs_concurrently_and_drops_failures(self):
+        in_flight = 0
+        peak = 0
+
+        async def create(**request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            prompt = request["messages"][0]["content"]
+            if "broken" in prompt:
+                raise RuntimeError("API Error")
+            return _mock_openai_response(json.dumps({"title": prompt.split("Transcript:\n")[1][:5], "summary": "S"}))
+
+        jobs = [SummarizeJob(f"{i}.m4a", f"text{i}", 60.0, 1) for i in range(5)]
+        jobs.append(SummarizeJob("bad.m4a", "broken", 60.0, 1))
+        with patch("scribe.summarizer.AsyncOpenAI") as MockClient:
+            client = MockClient.return_value.__aenter__.return_value
+            client.chat.completions.create = create
+            result = summarize_many(jobs, "fake-key", concurrency=3)
+
+        assert sorted(result) == [f"{i}.m4a" for i in range(5)]
+        assert result["2.m4a"].title == "text2"
+        assert peak == 3
+        MockClient.assert_called_once_with(api_key="fake-key")
+
+    def test_no_jobs_skips_api(self):
+        with patch("scribe.summarizer.AsyncOpenAI") as MockClient:
+            assert summarize_many([], "fake-key") == {}
+            MockClient.assert_not_called()
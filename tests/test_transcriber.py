@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from deepgram.core import ApiError
+
+from scribe import transcriber
+
+
+@pytest.fixture(autouse=True)
+def _fresh_client():
+    """Each test patches DeepgramClient, so don't let a cached client leak between tests."""
+    transcriber._create_client.cache_clear()
+    yield
+    transcriber._create_client.cache_clear()
+
+
+def test_uploads_file_as_chunked_stream(tmp_path, monkeypatch):
+    """Each attempt streams the whole file afresh, in UPLOAD_CHUNK_SIZE pieces."""
+    monkeypatch.setattr(transcriber, "UPLOAD_CHUNK_SIZE", 4)
+    monkeypatch.setattr(transcriber, "INITIAL_BACKOFF", 0)
+    recording = tmp_path / "memo.m4a"
+    recording.write_bytes(b"0123456789")
+
+    uploads = []
+
+    def transcribe_file(request, **kwargs):
+        uploads.append(list(request))
+        if len(uploads) == 1:
+            raise ApiError(status_code=503)
+        return MagicMock(model_dump=lambda: {"results": {}})
+
+    with patch("scribe.transcriber.DeepgramClient") as MockClient:
+        MockClient.return_value.listen.v1.media.transcribe_file.side_effect = transcribe_file
+        assert transcriber.transcribe("fake-key", str(recording)) == {"results": {}}
+
+    assert uploads == [[b"0123", b"4567", b"89"]] * 2
+
+
+def test_retry_delay_uses_status_code_not_message():
+    assert transcriber._retry_delay(ApiError(status_code=400, body="request 500 failed"), 0) is None
+    assert transcriber._retry_delay(RuntimeError("HTTP 503"), 0) is None
+    assert 1.0 <= transcriber._retry_delay(ApiError(status_code=502), 0) <= 3.0
+    assert 1.0 <= transcriber._retry_delay(httpx.ConnectError("refused"), 0) <= 3.0
+
+
+def test_retry_delay_honours_retry_after():
+    error = ApiError(status_code=429, headers={"retry-after": "7"})
+    assert transcriber._retry_delay(error, 0) == 7.0
+
+
+def test_retry_delay_caps_retry_after():
+    error = ApiError(status_code=429, headers={"retry-after": "86400"})
+    assert transcriber._retry_delay(error, 0) == transcriber.MAX_RETRY_AFTER
+
+
+def test_transcode_skips_small_files_and_missing_ffmpeg(tmp_path, monkeypatch):
+    recording = tmp_path / "memo.m4a"
+    recording.write_bytes(b"x" * 100)
+    assert transcriber._transcode_to_opus(str(recording)) is None
+
+    monkeypatch.setattr(transcriber, "TRANSCODE_MIN_BYTES", 10)
+    monkeypatch.setattr(transcriber.shutil, "which", lambda name: None)
+    assert transcriber._transcode_to_opus(str(recording)) is None
+
+
+def test_transcoded_upload_is_removed(tmp_path, monkeypatch):
+    recording = tmp_path / "memo.m4a"
+    recording.write_bytes(b"original")
+    transcoded = tmp_path / "memo.ogg"
+    transcoded.write_bytes(b"opus")
+    monkeypatch.setattr(transcriber, "_transcode_to_opus", lambda path: transcoded)
+
+    uploads = []
+
+    def transcribe_file(request, **kwargs):
+        uploads.append(b"".join(request))
+        return MagicMock(model_dump=lambda: {"results": {}})
+
+    with patch("scribe.transcriber.DeepgramClient") as MockClient:
+        MockClient.return_value.listen.v1.media.transcribe_file.side_effect = transcribe_file
+        transcriber.transcribe("fake-key", str(recording), transcode=True)
+
+    assert uploads == [b"opus"]
+    assert not transcoded.exists()
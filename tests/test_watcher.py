@@ -0,0 +1,125 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from watchdog.events import FileCreatedEvent, FileModifiedEvent
+
+from scribe import watcher
+
+
+def test_waits_for_writes_to_stop(tmp_path, monkeypatch):
+    """The callback fires only after a quiet period following the last modify event."""
+    monkeypatch.setattr(watcher, "QUIET_PERIOD", 0.2)
+    monkeypatch.setattr(watcher, "POLL_INTERVAL", 0.05)
+    recording = tmp_path / "memo.m4a"
+    recording.write_bytes(b"x")
+
+    done = threading.Event()
+    fired_at = []
+
+    def callback(path):
+        fired_at.append(time.monotonic())
+        done.set()
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    handler = watcher._RecordingHandler(callback, executor, stable_window=0.1)
+    handler.on_created(FileCreatedEvent(str(recording)))
+    for _ in range(3):
+        time.sleep(0.1)
+        with recording.open("ab") as f:
+            f.write(b"more")
+        handler.on_modified(FileModifiedEvent(str(recording)))
+    last_write = time.monotonic()
+
+    assert done.wait(5)
+    assert fired_at[0] - last_write >= 0.2
+    assert handler._last_event == {}
+    executor.shutdown()
+
+
+def test_duplicate_create_event_runs_pipeline_once(tmp_path, monkeypatch):
+    """FSEvents can report a creation twice; the second must not start another pipeline."""
+    monkeypatch.setattr(watcher, "QUIET_PERIOD", 0.1)
+    monkeypatch.setattr(watcher, "POLL_INTERVAL", 0.02)
+    recording = tmp_path / "memo.m4a"
+    recording.write_bytes(b"x")
+    calls = []
+
+    def callback(path):
+        calls.append(path)
+        time.sleep(0.3)
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    handler = watcher._RecordingHandler(callback, executor, stable_window=0.05)
+    handler.on_created(FileCreatedEvent(str(recording)))
+    time.sleep(0.05)
+    handler.on_created(FileCreatedEvent(str(recording)))  # while debouncing
+    time.sleep(0.3)
+    handler.on_created(FileCreatedEvent(str(recording)))  # while the callback runs
+    executor.shutdown(wait=True)
+    assert calls == [str(recording)]
+    assert handler._in_flight == set()
+
+
+def test_waits_out_a_pause_in_writing(tmp_path, monkeypatch):
+    """A pause shorter than the stable window must not be taken as the end of the recording."""
+    monkeypatch.setattr(watcher, "QUIET_PERIOD", 0.05)
+    monkeypatch.setattr(watcher, "POLL_INTERVAL", 0.02)
+    recording = tmp_path / "memo.m4a"
+    recording.write_bytes(b"x")
+    sizes = []
+    done = threading.Event()
+
+    def callback(path):
+        sizes.append(recording.stat().st_size)
+        done.set()
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    handler = watcher._RecordingHandler(callback, executor, stable_window=0.5)
+    handler.on_created(FileCreatedEvent(str(recording)))
+    time.sleep(0.3)  # past the quiet period, inside the stable window
+    with recording.open("ab") as f:
+        f.write(b"rest")
+    handler.on_modified(FileModifiedEvent(str(recording)))
+
+    assert done.wait(5)
+    assert sizes == [5]
+    executor.shutdown()
+
+
+def test_ignores_non_recordings(tmp_path):
+    calls = []
+    executor = MagicMock()
+    handler = watcher._RecordingHandler(calls.append, executor)
+    handler.on_created(FileCreatedEvent(str(tmp_path / "CloudRecordings.db")))
+    handler.on_modified(FileModifiedEvent(str(tmp_path / "CloudRecordings.db")))
+    assert calls == []
+    assert handler._last_event == {}
+    executor.submit.assert_not_called()
+
+
+def test_pool_size_bounds_concurrent_callbacks(tmp_path, monkeypatch):
+    monkeypatch.setattr(watcher, "QUIET_PERIOD", 0)
+    monkeypatch.setattr(watcher, "POLL_INTERVAL", 0.01)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def callback(path):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.1)
+        with lock:
+            running -= 1
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    handler = watcher._RecordingHandler(callback, executor, stable_window=0.02)
+    for i in range(4):
+        recording = tmp_path / f"memo{i}.m4a"
+        recording.write_bytes(b"x")
+        handler.on_created(FileCreatedEvent(str(recording)))
+    executor.shutdown(wait=True)
+    assert peak == 2